@@ -0,0 +1,44 @@
+"""Benchmark de la simulación sin ventana (World + run_headless).
+
+- Pasos/s de terreno, física, spawns y reglas de combustible a dt fijo.
+- Varias partidas con semillas consecutivas, acelerando siempre.
+
+Uso: python benchmarks/bench_headless.py [--runs N] [--steps N] [--seed S] [--dt DT]
+"""
+import argparse
+import os
+import sys
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import codJuego  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--steps", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--dt", type=float, default=1.0 / codJuego.FPS)
+    args = parser.parse_args()
+
+    # Calentamiento (carga de imágenes, primeras rutas)
+    codJuego.run_headless(200, args.dt, seed=args.seed)
+
+    total_steps = 0
+    total_wall = 0.0
+    for i in range(args.runs):
+        r = codJuego.run_headless(args.steps, args.dt, seed=args.seed + i)
+        total_steps += r['steps']
+        total_wall += r['wall_seconds']
+        over = f"game over en {r['game_over_step']}" if r['game_over_step'] else "sin game over"
+        print(f"semilla {r['seed']}: {r['steps']:>6} pasos ({r['sim_seconds']:.0f} s simulados) "
+              f"{r['steps_per_sec']:>10,.0f} pasos/s  {r['distance_m']} m, {r['coins']} monedas, {over}")
+    rate = total_steps / total_wall if total_wall > 0 else float('inf')
+    print(f"\ntotal: {total_steps} pasos, {rate:,.0f} pasos/s "
+          f"({rate * args.dt:,.0f}x tiempo real)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Benchmark de arranque: desde lanzar el proceso hasta el primer frame.
+
+- Lanza ``python codJuego.py --first-frame`` varias veces (driver dummy)
+  y mide hasta que el juego imprime que envió el primer frame.
+- Compara el arranque normal (MINIMAL_INIT, fuentes en caché) con
+  ``--full-init`` (pygame.init() completo y mixer desde el principio).
+
+Uso: python benchmarks/bench_startup.py [--runs N]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+def launch(extra_args) -> tuple:
+    """(ms hasta el primer frame visto desde fuera, ms según el juego)."""
+    env = dict(os.environ)
+    env.setdefault("SDL_VIDEODRIVER", "dummy")
+    env.setdefault("SDL_AUDIODRIVER", "dummy")
+    t0 = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "codJuego.py", "--first-frame", *extra_args],
+                            cwd=ROOT, env=env, stdout=subprocess.PIPE, text=True)
+    inner = None
+    for line in proc.stdout:
+        if line.startswith("primer frame:"):
+            outer = (time.perf_counter() - t0) * 1000
+            inner = float(line.split(":")[1].split()[0])
+            break
+    proc.wait()
+    if inner is None:
+        raise SystemExit(f"codJuego.py {' '.join(extra_args)} no llegó al primer frame")
+    return outer, inner
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=7)
+    args = parser.parse_args()
+
+    launch([]) # Calentamiento (cachés de .pyc, atlas y fuentes)
+    for name, extra in (("mínimo", []), ("completo", ["--full-init"])):
+        runs = [launch(extra) for _ in range(args.runs)]
+        outer = statistics.median(r[0] for r in runs)
+        inner = statistics.median(r[1] for r in runs)
+        print(f"{name:>9}: {outer:7.1f} ms desde el lanzamiento ({inner:6.1f} ms dentro del juego), "
+              f"mediana de {args.runs}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Benchmark de generación de terreno.
+
+- Acceso secuencial vs aleatorio por chunk.
+- Tiles/s de la ruta en Python vs la vectorizada con NumPy, pidiendo el
+  terreno en bloques como Game.update.
+
+Uso: python benchmarks/bench_terrain.py [--chunks N] [--seed S] [--step TILES]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import codJuego  # noqa: E402
+
+
+def new_terrain(seed: int, vectorized: bool = False) -> codJuego.Terrain:
+    return codJuego.Terrain(codJuego.TILE_SIZE, codJuego.INITIAL_TILES, codJuego.TERRAIN_Y, None,
+                            seed=seed, vectorized=vectorized)
+
+
+def bench_sequential(seed: int, chunks: int) -> float:
+    terrain = new_terrain(seed)
+    t0 = time.perf_counter()
+    for k in range(chunks):
+        terrain.build_chunk(k)
+    return time.perf_counter() - t0
+
+
+def bench_random_access(seed: int, chunks: int) -> float:
+    # Fronteras ya conocidas (como tras jugar o tras descartar chunks)
+    terrain = new_terrain(seed)
+    terrain.chunk_start_y(chunks - 1)
+    order = list(range(chunks))
+    random.Random(seed).shuffle(order)
+    t0 = time.perf_counter()
+    for k in order:
+        terrain.build_chunk(k)
+    return time.perf_counter() - t0
+
+
+def bench_path(seed: int, tiles: int, step: int, vectorized: bool) -> float:
+    # Tiles/s pidiendo el terreno en bloques de step tiles
+    terrain = new_terrain(seed, vectorized)
+    start = len(terrain.tiles)
+    t0 = time.perf_counter()
+    for end in range(start + step, start + tiles + 1, step):
+        terrain.ensure_tiles(end - 1)
+    return (len(terrain.tiles) - start) / (time.perf_counter() - t0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--step", type=int, default=codJuego.SPAWN_AHEAD_TILES + 400)
+    args = parser.parse_args()
+
+    # Calentamiento para que ambas mediciones partan en igualdad de condiciones
+    bench_sequential(args.seed, 100)
+    bench_random_access(args.seed, 100)
+
+    seq = bench_sequential(args.seed, args.chunks)
+    rnd = bench_random_access(args.seed, args.chunks)
+    for name, secs in (("secuencial", seq), ("aleatorio", rnd)):
+        print(f"{name:>10}: {secs / args.chunks * 1e6:8.1f} us/chunk  "
+              f"({args.chunks * codJuego.TERRAIN_CHUNK_TILES / secs:,.0f} tiles/s)")
+    print(f"aleatorio/secuencial: {rnd / seq:.2f}x")
+
+    tiles = args.chunks * codJuego.TERRAIN_CHUNK_TILES
+    python_rate = bench_path(args.seed, tiles, args.step, vectorized=False)
+    print(f"\n{'python':>10}: {python_rate:,.0f} tiles/s (bloques de {args.step})")
+    if codJuego.np is None:
+        print(f"{'numpy':>10}: no instalado")
+        return
+    for step in (codJuego.TERRAIN_CHUNK_TILES, args.step):
+        numpy_rate = bench_path(args.seed, tiles, step, vectorized=True)
+        print(f"{'numpy':>10}: {numpy_rate:,.0f} tiles/s (bloques de {step}, "
+              f"{numpy_rate / python_rate:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+"""Suite de benchmarks de las rutas calientes del juego (sin ventana).
+
+- Terreno: tiles/s de Terrain.generate_chunk y ensure_tiles, llamadas/s
+  de terrain_interpolated_y.
+- Spawns: tiles/s de plan_spawns sobre 400 tiles en una llamada.
+- Game.update con 100, 1k y 10k coleccionables vivos en pantalla.
+- Un Terrain.draw y un draw_game sobre una superficie fuera de pantalla.
+- Dibujo de 50, 500 y 5000 coleccionables visibles (layout + blits).
+- Una partida guionizada de 10 minutos (run_headless, acelerando siempre).
+- Carga de assets: atlas rehecho desde los PNG y leído de la caché.
+
+Todo usa semillas fijas; cada medición se repite --repeat veces y se
+guarda la mejor. Resultados en JSON (más es mejor en todas las métricas).
+
+Uso: python benchmarks/suite.py run [--out FICHERO] [--repeat N] [--only TEXTO]
+     python benchmarks/suite.py compare BASE.json ACTUAL.json [--tolerance 0.10]
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+sys.path.insert(0, ROOT)
+
+import pygame  # noqa: E402
+
+import codJuego  # noqa: E402
+
+SEED = 1234
+DRIVE_STEPS = 10 * 60 * codJuego.FPS # 10 minutos a 60 pasos/s
+
+
+def new_terrain(vectorized: bool = False) -> codJuego.Terrain:
+    return codJuego.Terrain(codJuego.TILE_SIZE, codJuego.INITIAL_TILES, codJuego.TERRAIN_Y, None,
+                            seed=SEED, vectorized=vectorized)
+
+
+def bench_generate_chunk(vectorized: bool):
+    def run():
+        terrain = new_terrain(vectorized)
+        start = len(terrain.tiles)
+        t0 = time.perf_counter()
+        for _ in range(500):
+            terrain.generate_chunk(codJuego.TERRAIN_CHUNK_TILES)
+        return (len(terrain.tiles) - start) / (time.perf_counter() - t0)
+    return run
+
+
+def bench_ensure_tiles():
+    # Como el streaming: la frontera avanza de 16 en 16 tiles
+    terrain = new_terrain()
+    start = len(terrain.tiles)
+    t0 = time.perf_counter()
+    for idx in range(start, start + 32000, 16):
+        terrain.ensure_tiles(idx)
+    return (len(terrain.tiles) - start) / (time.perf_counter() - t0)
+
+
+def bench_interpolated_y():
+    terrain = new_terrain()
+    terrain.ensure_tiles(2000)
+    xs = range(0, 1999 * codJuego.TILE_SIZE, 7)
+    t0 = time.perf_counter()
+    for x in xs:
+        terrain.terrain_interpolated_y(x)
+    return len(xs) / (time.perf_counter() - t0)
+
+
+def bench_plan_spawns():
+    # Los chunks que cubren 400 tiles, con sus tablas ya calculadas
+    terrain = new_terrain()
+    chunks = -(-400 // terrain.chunk_tiles)
+    first_chunk = codJuego.SPAWN_START_TILE // terrain.chunk_tiles + 1
+    luts = [terrain.chunk_lut(k) for k in range(first_chunk, first_chunk + chunks)]
+    calls = 200
+    t0 = time.perf_counter()
+    for _ in range(calls):
+        codJuego.plan_spawns(SEED, first_chunk, luts, codJuego.SpawnState(), terrain.tile_size)
+    return calls * chunks * terrain.chunk_tiles / (time.perf_counter() - t0)
+
+
+def new_game() -> codJuego.Game:
+    codJuego.TERRAIN_SEED = SEED
+    game = codJuego.Game()
+    game.start_game()
+    # Se dibuja en una superficie fuera de pantalla del mismo formato
+    game.screen = game.screen.copy()
+    return game
+
+
+def fill_collectibles(game: codJuego.Game, count: int):
+    # Repartidos por los tiles visibles y en el cielo, lejos del coche
+    world = game.world
+    world.collectibles.clear()
+    first, last = game.visible_tiles(0)
+    tiles = last - first + 1
+    coin = codJuego.SPAWN_KIND_CODES['coin']
+    for i in range(count):
+        tile_idx = first + i * tiles // count # En orden de tile, como el streaming
+        world.collectibles.add(tile_idx, coin, tile_idx * codJuego.TILE_SIZE, 60)
+
+
+def bench_game_update(game: codJuego.Game, count: int):
+    def run():
+        game.restart()
+        fill_collectibles(game, count)
+        frames = 200
+        t0 = time.perf_counter()
+        for _ in range(frames):
+            game.update(codJuego.PHYSICS_DT)
+        return frames / (time.perf_counter() - t0)
+    return run
+
+
+def bench_terrain_draw(game: codJuego.Game):
+    def run():
+        terrain = game.world.terrain
+        frames = 300
+        t0 = time.perf_counter()
+        for i in range(frames):
+            terrain.draw(game.screen, i * 7.0, None, game.street_img)
+        return frames / (time.perf_counter() - t0)
+    return run
+
+
+def bench_draw_game(game: codJuego.Game):
+    def run():
+        game.restart()
+        fill_collectibles(game, 100)
+        frames = 200
+        t0 = time.perf_counter()
+        for _ in range(frames):
+            game.draw_game()
+        return frames / (time.perf_counter() - t0)
+    return run
+
+
+def bench_draw_entities(game: codJuego.Game, count: int):
+    def run():
+        game.restart()
+        fill_collectibles(game, count)
+        store = game.world.collectibles
+        visible = game.visible_tiles(game.world.collectible_max_w)
+        frames = 200
+        t0 = time.perf_counter()
+        for _ in range(frames):
+            store.animate(codJuego.PHYSICS_DT, *visible)
+            store.layout(game.view_x, *visible)
+            store.draw(game.screen)
+        return frames / (time.perf_counter() - t0)
+    return run
+
+
+def bench_atlas_build():
+    t0 = time.perf_counter()
+    codJuego.SpriteAtlas.build().get('sky')
+    return 1.0 / (time.perf_counter() - t0)
+
+
+def bench_atlas_cached():
+    codJuego.SpriteAtlas.load_or_build() # Asegura que la caché existe
+    t0 = time.perf_counter()
+    atlas = codJuego.SpriteAtlas.load_or_build()
+    atlas.get('sky')
+    return 1.0 / (time.perf_counter() - t0)
+
+
+def bench_drive():
+    r = codJuego.run_headless(DRIVE_STEPS, seed=SEED, stop_on_game_over=False)
+    return r['steps_per_sec']
+
+
+def benchmarks() -> list:
+    """(nombre, función que devuelve una tasa, unidad)."""
+    game = new_game()
+    benches = [
+        ("terrain.generate_chunk.python", bench_generate_chunk(False), "tiles/s"),
+    ]
+    if codJuego.np is not None:
+        benches.append(("terrain.generate_chunk.numpy", bench_generate_chunk(True), "tiles/s"))
+    benches += [
+        ("terrain.ensure_tiles", bench_ensure_tiles, "tiles/s"),
+        ("terrain.interpolated_y", bench_interpolated_y, "llamadas/s"),
+        ("spawn.plan_400", bench_plan_spawns, "tiles/s"),
+        ("game.update.100", bench_game_update(game, 100), "frames/s"),
+        ("game.update.1k", bench_game_update(game, 1000), "frames/s"),
+        ("game.update.10k", bench_game_update(game, 10000), "frames/s"),
+        ("terrain.draw", bench_terrain_draw(game), "frames/s"),
+        ("game.draw_game", bench_draw_game(game), "frames/s"),
+        ("draw.entities.50", bench_draw_entities(game, 50), "frames/s"),
+        ("draw.entities.500", bench_draw_entities(game, 500), "frames/s"),
+        ("draw.entities.5000", bench_draw_entities(game, 5000), "frames/s"),
+        ("drive.10min", bench_drive, "pasos/s"),
+        ("assets.build", bench_atlas_build, "cargas/s"),
+        ("assets.cached", bench_atlas_cached, "cargas/s"),
+    ]
+    return benches
+
+
+def cmd_run(args):
+    # Las rutas de los assets son relativas a la raíz del repositorio
+    os.chdir(ROOT)
+    results = {}
+    for name, fn, unit in benchmarks():
+        if args.only and args.only not in name:
+            continue
+        fn() # Calentamiento
+        best = max(fn() for _ in range(args.repeat))
+        results[name] = {'value': best, 'unit': unit}
+        print(f"{name:<32}{best:>16,.1f} {unit}")
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'pygame': pygame.version.ver,
+            'numpy': codJuego.np.__version__ if codJuego.np is not None else None,
+            'machine': platform.platform(),
+            'seed': SEED,
+            'repeat': args.repeat,
+        },
+        'results': results,
+    }
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+def cmd_compare(args):
+    with open(args.baseline, encoding="utf-8") as f:
+        base = json.load(f)['results']
+    with open(args.current, encoding="utf-8") as f:
+        current = json.load(f)['results']
+    regressions = 0
+    for name in sorted(set(base) | set(current)):
+        if name not in base or name not in current:
+            print(f"{name:<32}{'(solo en ' + ('actual' if name in current else 'base') + ')':>24}")
+            continue
+        ratio = current[name]['value'] / base[name]['value']
+        flag = ""
+        if ratio < 1.0 - args.tolerance:
+            flag = "  REGRESIÓN"
+            regressions += 1
+        print(f"{name:<32}{base[name]['value']:>14,.1f} -> {current[name]['value']:>14,.1f} "
+              f"{current[name]['unit']:<11}{ratio:6.2f}x{flag}")
+    if regressions:
+        print(f"\n{regressions} regresiones (más de un {args.tolerance:.0%} por debajo de la base)")
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    run = sub.add_parser("run")
+    run.add_argument("--out")
+    run.add_argument("--repeat", type=int, default=5)
+    run.add_argument("--only")
+    compare = sub.add_parser("compare")
+    compare.add_argument("baseline")
+    compare.add_argument("current")
+    compare.add_argument("--tolerance", type=float, default=0.10)
+    args = parser.parse_args()
+    sys.exit(cmd_run(args) if args.command == "run" else cmd_compare(args))
+
+
+if __name__ == "__main__":
+    main()
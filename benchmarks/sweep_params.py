@@ -0,0 +1,123 @@
+"""Barrido de parámetros de spawn y combustible con partidas sin ventana.
+
+- Cada combinación de la rejilla se juega con --runs semillas consecutivas.
+- Las partidas se reparten en un multiprocessing.Pool (un proceso por núcleo).
+- Cada resultado se escribe en cuanto llega, en JSONL o CSV según la
+  extensión de --out (sin --out, JSONL por la salida estándar).
+
+Uso: python benchmarks/sweep_params.py [--grid NOMBRE=v1,v2 ...] [--runs N]
+         [--steps N] [--seed S] [--policy acelerar|pulsos] [--workers N] [--out FICHERO]
+
+Ejemplo: --grid FUEL_PICKUP=20,30,40 --grid FUEL_SPAWN_CHANCE=0.05,0.07
+"""
+import argparse
+import csv
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+sys.path.insert(0, ROOT)
+
+import codJuego  # noqa: E402
+
+# Parámetros que se pueden barrer (globales que el juego lee en cada uso)
+TUNABLE = ("COIN_SPAWN_CHANCE", "FUEL_SPAWN_CHANCE", "NOS_SPAWN_CHANCE",
+           "FUEL_DECAY_PER_SEC", "FUEL_PICKUP")
+
+FIELDS = ("seed", "distance_m", "coins", "time_to_empty", "steps", "wall_seconds")
+
+_images = None # Imágenes del mundo, cargadas una vez por proceso
+
+
+def policy_full(step, world, keys=codJuego.DriveKeys(1)):
+    return keys
+
+
+def policy_pulse(step, world, on=codJuego.DriveKeys(1), off=codJuego.DriveKeys(0)):
+    # Acelera 3 s y suelta 1 s
+    return off if step % (4 * codJuego.FPS) >= 3 * codJuego.FPS else on
+
+
+POLICIES = {'acelerar': policy_full, 'pulsos': policy_pulse}
+
+
+def parse_grid(specs) -> dict:
+    grid = {}
+    for spec in specs:
+        name, _, values = spec.partition("=")
+        if name not in TUNABLE or not values:
+            raise SystemExit(f"--grid {spec!r}: se espera NOMBRE=v1,v2 con NOMBRE en {', '.join(TUNABLE)}")
+        grid[name] = [float(v) for v in values.split(",")]
+    return grid
+
+
+def init_worker():
+    global _images
+    # Las rutas de los assets son relativas a la raíz del repositorio
+    os.chdir(ROOT)
+    _images = codJuego.load_world_images()
+
+
+def run_one(task) -> dict:
+    params, seed, steps, policy = task
+    for name, value in params.items():
+        setattr(codJuego, name, value)
+    r = codJuego.run_headless(steps, seed=seed, policy=POLICIES[policy], images=_images)
+    row = dict(params)
+    row.update(seed=r['seed'], distance_m=r['distance_m'], coins=r['coins'],
+               time_to_empty=round(r['sim_seconds'], 3) if r['game_over_step'] else None,
+               steps=r['steps'], wall_seconds=round(r['wall_seconds'], 4))
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--grid", action="append", default=[])
+    parser.add_argument("--runs", type=int, default=8)
+    parser.add_argument("--steps", type=int, default=36000) # 10 minutos a 60 FPS
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="acelerar")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--out")
+    args = parser.parse_args()
+
+    grid = parse_grid(args.grid)
+    names = list(grid)
+    combos = [dict(zip(names, values)) for values in itertools.product(*grid.values())]
+    tasks = [(params, args.seed + i, args.steps, args.policy)
+             for params in combos for i in range(args.runs)]
+
+    out = open(args.out, "w", newline="") if args.out else sys.stdout
+    as_csv = bool(args.out) and args.out.endswith(".csv")
+    writer = None
+    if as_csv:
+        writer = csv.DictWriter(out, fieldnames=names + list(FIELDS))
+        writer.writeheader()
+
+    t0 = time.perf_counter()
+    sim_wall = 0.0
+    try:
+        with multiprocessing.Pool(args.workers, initializer=init_worker) as pool:
+            for row in pool.imap_unordered(run_one, tasks):
+                sim_wall += row['wall_seconds']
+                if writer is not None:
+                    writer.writerow(row)
+                else:
+                    out.write(json.dumps(row) + "\n")
+                out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    wall = time.perf_counter() - t0
+    # Aceleración = tiempo de simulación sumado / tiempo real (ideal: --workers)
+    print(f"{len(tasks)} partidas ({len(combos)} combinaciones x {args.runs} semillas) en {wall:.2f} s, "
+          f"{args.workers} procesos, aceleración {sim_wall / wall:.2f}x", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
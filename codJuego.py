@@ -1,8 +1,34 @@
-﻿import pygame
-import random
+﻿import time
+STARTUP_T0 = time.perf_counter() # [NUEVO] Para medir el tiempo hasta el primer frame
 import sys
+
+# [NUEVO] pygame.pkgdata importa pkg_resources (unos 100 ms) solo para
+# localizar sus ficheros de datos; sin él usa la carpeta del paquete, que
+# es lo mismo. Solo al lanzar el juego, y se deshace tras importar pygame.
+_skip_pkg_resources = __name__ == "__main__" and "pkg_resources" not in sys.modules
+if _skip_pkg_resources:
+    sys.modules["pkg_resources"] = None
+import pygame
+if _skip_pkg_resources:
+    del sys.modules["pkg_resources"]
+import random
 import math
-from typing import Tuple, List
+import os
+import json
+import struct
+import zlib
+from array import array
+import queue
+import threading
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict, deque
+from contextlib import nullcontext
+from typing import Tuple, List, NamedTuple
+
+try:
+    import numpy as np # [NUEVO] Opcional: generación vectorizada del terreno
+except ImportError:
+    np = None
 
 # ------------------------------
 # CONFIGURACIÓN GLOBAL (FÁCIL AJUSTE)
@@ -14,11 +40,23 @@ FPS = 60
 DEBUG_SPAWN = False
 DEBUG_FORCE_SPAWN = True
 DEBUG_DRAW_PHYSICS = False # [MODIFICADO] Desactivado, ya no se usa la física compleja
+DEBUG_OVERLAY = False # [NUEVO] Panel de estadísticas (se alterna con F3)
 
 # Tiles / estética
 TILE_SIZE = 64
 INITIAL_TILES = 800
 TERRAIN_Y = 400
+# [NUEVO] Terreno por chunks (memoria acotada en partidas largas)
+TERRAIN_CHUNK_TILES = 64 # Tiles por chunk (alturas en un array('h') compacto)
+TERRAIN_RETENTION_CHUNKS = 4 # Chunks que se conservan detrás de la cámara
+TERRAIN_SEED = None # [NUEVO] Semilla del terreno (None = aleatoria en cada ejecución)
+# [NUEVO] Generar chunks con NumPy si está instalado (opcional). Con la misma
+# semilla, el generador NumPy y el de Python dan mundos distintos: activarlo
+# cambia el terreno, los barridos y las bases de benchmarks de esa máquina.
+TERRAIN_VECTORIZED = False
+TERRAIN_RENDER_CACHE = True # [NUEVO] Dibujar el terreno desde franjas pre-compuestas
+TERRAIN_STRIP_TILES = 16 # Ancho de cada franja en tiles (4 franjas por chunk)
+TERRAIN_STRIP_CACHE_BYTES = 24 * 1024 * 1024 # Tope de memoria de las franjas
 
 # Jugador
 PLAYER_SCREEN_X = 150
@@ -51,6 +89,11 @@ COIN_MIN_SEPARATION_TILES = 1
 INITIAL_STREET_TILES = 20
 STREET_FULL_LENGTH = True
 COLLECTIBLE_VERTICAL_OFFSET = -60 # [MODIFICADO] Reducido de -100 para estar más cerca del suelo
+COIN_BOB_PX = 6 # Altura del vaivén de las monedas
+COIN_BOB_SPEED = 3.5 # [NUEVO] Fase del vaivén (rad/s)
+COIN_BOB_STEPS = 32 # [NUEVO] Fases distintas por vuelta (desplazamiento precalculado por fase)
+ENTITY_VECTORIZED = True # [NUEVO] Animar y colocar las entidades con NumPy si está instalado
+ENTITY_VECTORIZE_MIN = 64 # [NUEVO] Con menos entidades en el rango, el bucle es más rápido
 
 # [NUEVO] Configuración de Decoraciones
 DECORATION_SPAWN_CHANCE = 0.1 # 10% de chance por tile elegible
@@ -61,23 +104,58 @@ DECORATION_SPAWN_CHANCE = 0.1
 DECORATION_MIN_SEPARATION_TILES = 5
 # Movimiento
 CAMERA_SPEED_PX_PER_SEC = 300.0
+# [NUEVO] Física a paso fijo (independiente de los FPS de dibujo)
+PHYSICS_DT = 1.0 / 60 # Segundos por paso de física
+MAX_PHYSICS_STEPS = 5 # Pasos máximos por frame; el tiempo que sobra se descarta
 SPAWN_AHEAD_TILES = (SCREEN_W // TILE_SIZE) + 8
 
+# [NUEVO] Streaming del mundo (generación repartida entre frames)
+STREAM_BUDGET_MS = 2.0 # Tiempo máximo por frame para generar terreno y spawns
+STREAM_LOW_WATER_TILES = SPAWN_AHEAD_TILES + 16 # Por debajo se genera sin mirar el presupuesto
+STREAM_HIGH_WATER_TILES = SPAWN_AHEAD_TILES + 400 # Objetivo de tiles poblados por delante de la cámara
+WORKER_PREGEN = False # [NUEVO] Pre-generar chunks (terreno + spawns) en un hilo aparte
+WORKER_QUEUE_CHUNKS = 8 # Capacidad de la cola de chunks terminados
+
+# [NUEVO] Render parcial: solo se envían a pantalla las zonas que cambiaron
+DIRTY_RECT_RENDERING = True
+STATIC_SCREEN_WAIT_MS = 500 # Espera máxima por entrada en menú / game over
+TEXT_CACHE_SIZE = 128 # [NUEVO] Textos renderizados que se conservan (LRU)
+
+# [NUEVO] Perfilador de frames (F4 muestra la gráfica y lo activa)
+PROFILER_ENABLED = False # Medir desde el inicio aunque no se vea la gráfica
+PROFILER_HISTORY_FRAMES = 240 # Frames que se guardan para los percentiles
+PROFILER_REPORT_PATH = "profile_report.json" # Informe al salir (None = no escribir)
+STARTUP_STAGE_BUDGET_MS = 8.0 # [NUEVO] Carga en segundo plano por frame de menú
+RECORD_INPUT_PATH = None # [NUEVO] Grabar semilla + entrada por paso (p.ej. "partida.hdr")
+
+# [NUEVO] Atlas de sprites ya escalados, guardado en disco entre ejecuciones
+ASSET_ATLAS_CACHE = True
+ASSET_CACHE_PATH = "assets/.atlas_cache.bin" # Se rehace si cambian los PNG o las escalas
+ATLAS_MAX_WIDTH = 2048
+
+# [NUEVO] Arranque rápido
+MINIMAL_INIT = True # Solo display y fuentes; el mixer se inicia con el primer sonido
+FONT_CACHE_PATH = "assets/.font_cache.json" # Rutas de fuentes ya resueltas (None = buscar siempre)
+
 # Sonidos
 MUSIC_VOL = 0.25
 SFX_VOL = 0.8
+# [NUEVO] Mixer: formato fijo (los SFX se decodifican a él al cargarlos)
+AUDIO_FREQUENCY = 44100
+AUDIO_BUFFER = 512 # Muestras por bloque (latencia baja)
+SFX_CHANNELS = 4 # Canales reservados para efectos (la música va aparte)
 
 # ------------------------------
 # UTILIDADES (carga robusta de recursos) - (Mantenidas)
 # ------------------------------
-# ... (load_image, load_sound, load_sound_cached, load_music sin cambios) ...
+# ... (load_image y load_music sin cambios) ...
 
 def load_image(path: str, size: Tuple[int, int] = None, alpha=True, fallback_color=(160,120,60)):
     try:
-        if alpha:
-            img = pygame.image.load(path).convert_alpha()
-        else:
-            img = pygame.image.load(path).convert()
+        img = pygame.image.load(path)
+        # [MODIFICADO] Sin ventana (modo headless) no hay formato al que convertir
+        if pygame.display.get_surface() is not None:
+            img = img.convert_alpha() if alpha else img.convert()
         if size:
             img = pygame.transform.scale(img, size)
         return img
@@ -89,36 +167,66 @@ def load_image(path: str, size: Tuple[int, int] = None, alpha=True, fallback_col
         return surf
 
 
-def load_sound(path: str):
-    try:
-        s = pygame.mixer.Sound(path)
-        s.set_volume(SFX_VOL)
-        return s
-    except Exception:
-        # fallback: silent Sound-like object
-        class Silent:
-            def play(self, *args, **kwargs): pass
-            def set_volume(self, *a, **k): pass
-        return Silent()
+# [NUEVO] El mixer se inicia la primera vez que se usa el audio
+_mixer_ready = False
+def ensure_mixer() -> bool:
+    global _mixer_ready
+    if not _mixer_ready:
+        try:
+            pygame.mixer.init(frequency=AUDIO_FREQUENCY, size=-16, channels=2, buffer=AUDIO_BUFFER)
+            _mixer_ready = True
+        except Exception:
+            pass
+    return _mixer_ready
+
+
+# [NUEVO] SysFont recorre todas las fuentes del sistema la primera vez
+# (fc-list, registro...). Se guarda a qué fichero resolvió cada nombre
+# y las siguientes ejecuciones abren ese fichero directamente.
+_font_paths = None
+def _load_font_paths() -> dict:
+    global _font_paths
+    if _font_paths is None:
+        _font_paths = {}
+        if FONT_CACHE_PATH:
+            try:
+                with open(FONT_CACHE_PATH, encoding="utf-8") as f:
+                    _font_paths = json.load(f)
+            except (OSError, ValueError):
+                pass
+    return _font_paths
+
+
+def load_font(name: str, size: int, bold: bool = False) -> pygame.font.Font:
+    """Como pygame.font.SysFont, pero recordando la ruta resuelta en disco."""
+    paths = _load_font_paths()
+    key = f"{name}|{int(bold)}"
+    cached = paths.get(key)
+    if cached is not None and (cached[0] is None or os.path.exists(cached[0])):
+        path, fake_bold = cached
+        return pygame.sysfont.font_constructor(path, size, fake_bold, False)
+
+    resolved = []
+    def constructor(path, size, fake_bold, fake_italic):
+        resolved.append([path, fake_bold])
+        return pygame.sysfont.font_constructor(path, size, fake_bold, fake_italic)
+    font = pygame.font.SysFont(name, size, bold=bold, constructor=constructor)
+    paths[key] = resolved[0]
+    if FONT_CACHE_PATH:
+        try:
+            with open(FONT_CACHE_PATH, "w", encoding="utf-8") as f:
+                json.dump(paths, f)
+        except OSError:
+            pass
+    return font
 
 
-_sound_cache = {}
-def load_sound_cached(path: str):
-    if path in _sound_cache:
-        return _sound_cache[path]
-    try:
-        s = pygame.mixer.Sound(path)
-        s.set_volume(SFX_VOL)
-    except Exception:
-        class Silent:
-            def play(self, *a, **k): pass
-            def set_volume(self, *a, **k): pass
-        s = Silent()
-    _sound_cache[path] = s
-    return s
+# [MODIFICADO] load_sound y load_sound_cached eliminados: los efectos los
+# carga AudioManager (mudo si no hay mixer o fichero)
 
 
 def load_music(path: str):
+    ensure_mixer()
     try:
         pygame.mixer.music.load(path)
         pygame.mixer.music.set_volume(MUSIC_VOL)
@@ -126,80 +234,727 @@ def load_music(path: str):
     except Exception:
         return False
 
-# ------------------------------
-# SPRITES
-# ------------------------------
-class Collectible(pygame.sprite.Sprite):
-    def __init__(self, world_x: float, world_y: float, image: pygame.Surface, kind: str):
-        super().__init__()
-        self.base_image = image
-        self.image = image
-        self.rect = self.image.get_rect()
-        self.world_x = float(world_x)
-        self.world_y = float(world_y)
-        self.kind = kind  # 'coin' | 'fuel' | 'nos'
-        self.collected = False
-        self._anim = 0.0
-
-    def update_screen_pos(self, camera_x: float):
-        sx = int(self.world_x - camera_x)
-        sy = int(self.world_y)
-        self.rect.topleft = (sx, sy)
-
-    def animate(self, dt: float):
-        if self.kind == 'coin':
-            self._anim += 3.5 * dt
-            self.image = self.base_image
-            self.rect = self.image.get_rect()
-
-    def draw(self, surface: pygame.Surface, camera_x: float):
-        sx = int(self.world_x - camera_x)
-        sy = int(self.world_y)
-        if self.kind == 'coin':
-            offset = int(6 * (0.5 + 0.5 * math.sin(self._anim)))
-            surface.blit(self.image, (sx, sy - offset))
+
+# [NUEVO] Efectos en un grupo fijo de canales reservados
+class AudioManager:
+    """Efectos pre-decodificados y música en streaming.
+
+    ``load(nombre, ruta)`` decodifica el efecto al formato del mixer una
+    sola vez. ``play(nombre)`` solo lo apunta: los pedidos de un frame se
+    agrupan (un mismo efecto suena una vez) y ``flush()`` los reparte
+    entre SFX_CHANNELS canales reservados, usando uno libre o, si están
+    todos ocupados, el más antiguo (en anillo). Sin mixer o sin el fichero,
+    todo es mudo, como antes.
+    """
+    def __init__(self, channels: int = SFX_CHANNELS):
+        self.enabled = ensure_mixer()
+        self.sounds = {}
+        self.pending = {} # nombre -> None (dict: orden de llegada sin repetidos)
+        self.channels = []
+        self.next_channel = 0
+        self.played = 0
+        self.merged = 0 # Pedidos descartados por repetidos en el mismo frame
+        if self.enabled:
+            try:
+                pygame.mixer.set_num_channels(max(pygame.mixer.get_num_channels(), channels))
+                pygame.mixer.set_reserved(channels)
+                self.channels = [pygame.mixer.Channel(i) for i in range(channels)]
+            except Exception:
+                self.enabled = False
+
+    def load(self, name: str, path: str) -> bool:
+        if not self.enabled:
+            return False
+        try:
+            sound = pygame.mixer.Sound(path)
+        except Exception:
+            return False
+        sound.set_volume(SFX_VOL)
+        self.sounds[name] = sound
+        return True
+
+    def play(self, name: str):
+        if name in self.pending:
+            self.merged += 1
         else:
-            surface.blit(self.image, (sx, sy))
+            self.pending[name] = None
 
-    def collect(self):
-        self.collected = True
-        self.kill()
+    def flush(self):
+        if not self.pending:
+            return
+        for name in self.pending:
+            sound = self.sounds.get(name)
+            if sound is not None:
+                self._channel().play(sound)
+                self.played += 1
+        self.pending.clear()
+
+    def _channel(self) -> 'pygame.mixer.Channel':
+        n = len(self.channels)
+        for i in range(n):
+            ch = self.channels[(self.next_channel + i) % n]
+            if not ch.get_busy():
+                self.next_channel = (self.next_channel + i + 1) % n
+                return ch
+        ch = self.channels[self.next_channel]
+        self.next_channel = (self.next_channel + 1) % n
+        return ch
+
+    def play_music(self, path: str):
+        # pygame.mixer.music ya decodifica por bloques en el hilo de audio
+        if self.enabled and load_music(path):
+            try:
+                pygame.mixer.music.play(-1)
+            except Exception:
+                pass
 
 
-# [NUEVO] Clase para las decoraciones (árboles)
-class Decoration(pygame.sprite.Sprite):
-    def __init__(self, world_x: float, world_y_base: float, image: pygame.Surface):
-        super().__init__()
-        self.image = image
-        self.rect = self.image.get_rect()
-        self.world_x = float(world_x) # Posición X (topleft)
-        self.world_y_base = float(world_y_base) # Posición Y (base)
-        # Colocamos la base del sprite en la Y del terreno
-        self.rect.bottomleft = (int(self.world_x), int(self.world_y_base))
+# [NUEVO] Sprites del juego: (nombre, ruta, tamaño, escala, alpha, color de fallback).
+# Con escala, el tamaño es el de fallback si la imagen no se puede escalar.
+def sprite_specs() -> tuple:
+    return (
+        ('sky', "assets/sky.png", (SCREEN_W * 2, SCREEN_H), None, False, (120,200,255)),
+        ('ground', "assets/ground.png", (TILE_SIZE, TILE_SIZE), None, False, (160,100,50)),
+        ('street', "assets/calle.png", (TILE_SIZE, TILE_SIZE), None, False, (120,120,120)),
+        ('car', "assets/lancer.png", None, CAR_SCALE, True, (220,220,220)),
+        ('coin', "assets/coin.png", (36,36), None, True, (240,220,20)),
+        ('nos', "assets/nos.png", (40,40), None, True, (120,200,255)),
+        ('fuel', "assets/fuel.png", (40,40), None, True, (200,0,0)),
+        ('tree1', "assets/arbol1.png", (80, 160), TREE_SCALE, True, (40, 100, 40)),
+        ('tree2', "assets/arbol2.png", (80, 160), TREE_SCALE, True, (60, 120, 60)),
+    )
+
+
+def build_sprite(path: str, size, scale, alpha: bool, fallback_color) -> pygame.Surface:
+    if scale is None:
+        return load_image(path, size, alpha=alpha, fallback_color=fallback_color)
+    original = load_image(path, size=None, alpha=alpha, fallback_color=fallback_color)
+    try:
+        ow, oh = original.get_size()
+        tw, th = max(1, int(ow * scale)), max(1, int(oh * scale))
+        return pygame.transform.scale(original, (tw, th))
+    except Exception:
+        return load_image(path, size=size, alpha=alpha, fallback_color=fallback_color)
+
+
+class SpriteAtlas:
+    """Todos los sprites, ya escalados, en una sola superficie.
+
+    ``get(nombre)`` devuelve una subsuperficie (los opacos, una copia
+    convertida sin alpha para que se dibujen igual de rápido que antes).
+    ``load_or_build`` lee el atlas de ASSET_CACHE_PATH si su clave (fechas
+    de los PNG y escalas) coincide; si no, lo rehace y lo guarda.
+    """
+    MAGIC = b"HDA1"
+
+    def __init__(self, surface: pygame.Surface, rects: dict, opaque: set):
+        self.surface = surface
+        self.rects = rects
+        self.opaque = opaque
+        self.loaded_from_cache = False
+        self.converted = False
+        self.convert()
+
+    def convert(self):
+        """Pasa el atlas al formato de la ventana (si ya hay ventana)."""
+        if not self.converted and pygame.display.get_surface() is not None:
+            self.surface = self.surface.convert_alpha()
+            self.converted = True
+
+    def get(self, name: str) -> pygame.Surface:
+        sub = self.surface.subsurface(self.rects[name])
+        if name in self.opaque and pygame.display.get_surface() is not None:
+            return sub.convert()
+        return sub
+
+    @staticmethod
+    def cache_key() -> dict:
+        mtimes = {}
+        for name, path, size, scale, alpha, color in sprite_specs():
+            try:
+                mtimes[path] = os.stat(path).st_mtime_ns
+            except OSError:
+                mtimes[path] = None
+        return {'mtimes': mtimes, 'car_scale': CAR_SCALE, 'tree_scale': TREE_SCALE,
+                'specs': [list(map(str, spec)) for spec in sprite_specs()]}
+
+    @classmethod
+    def build(cls) -> 'SpriteAtlas':
+        sprites = {}
+        opaque = set()
+        for name, path, size, scale, alpha, color in sprite_specs():
+            sprites[name] = build_sprite(path, size, scale, alpha, color)
+            if not alpha:
+                opaque.add(name)
+        # Estanterías: de la más alta a la más baja, de izquierda a derecha
+        width = max(ATLAS_MAX_WIDTH, max(img.get_width() for img in sprites.values()))
+        rects = {}
+        x = y = shelf_h = 0
+        for name in sorted(sprites, key=lambda n: -sprites[n].get_height()):
+            w, h = sprites[name].get_size()
+            if x + w > width:
+                x, y, shelf_h = 0, y + shelf_h, 0
+            rects[name] = pygame.Rect(x, y, w, h)
+            x += w
+            shelf_h = max(shelf_h, h)
+        surface = pygame.Surface((width, y + shelf_h), pygame.SRCALPHA)
+        for name, img in sprites.items():
+            surface.blit(img, rects[name])
+        return cls(surface, rects, opaque)
+
+    def save(self, path: str, key: dict):
+        header = json.dumps({
+            'key': key, 'size': self.surface.get_size(), 'opaque': sorted(self.opaque),
+            'rects': {name: list(r) for name, r in self.rects.items()},
+        }).encode("utf-8")
+        pixels = pygame.image.tobytes(self.surface, "RGBA")
+        tmp = f"{path}.{os.getpid()}.tmp" # Por proceso: los del barrido arrancan a la vez
+        with open(tmp, "wb") as f:
+            f.write(self.MAGIC + struct.pack("<I", len(header)) + header)
+            f.write(pixels)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str, key: dict) -> 'SpriteAtlas':
+        """El atlas guardado, o None si no existe o su clave no coincide."""
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        if data[:4] != cls.MAGIC:
+            return None
+        # Un fichero cortado o corrupto se trata como si no hubiera caché
+        try:
+            (header_len,) = struct.unpack_from("<I", data, 4)
+            header = json.loads(data[8:8 + header_len].decode("utf-8"))
+            if header['key'] != key:
+                return None
+            w, h = size = tuple(header['size'])
+            if len(data) != 8 + header_len + w * h * 4:
+                return None
+            # Sin copiar: la superficie usa los bytes leídos (convert() ya copia)
+            surface = pygame.image.frombuffer(memoryview(data)[8 + header_len:], size, "RGBA")
+            rects = {name: pygame.Rect(r) for name, r in header['rects'].items()}
+            opaque = set(header['opaque'])
+        except (ValueError, TypeError, struct.error, KeyError, pygame.error):
+            return None
+        atlas = cls(surface, rects, opaque)
+        atlas.loaded_from_cache = True
+        return atlas
+
+    @classmethod
+    def load_or_build(cls, path: str = ASSET_CACHE_PATH) -> 'SpriteAtlas':
+        key = json.loads(json.dumps(cls.cache_key())) # Igual que tras leerla del JSON
+        atlas = cls.load(path, key) if ASSET_ATLAS_CACHE else None
+        if atlas is None:
+            atlas = cls.build()
+            if ASSET_ATLAS_CACHE:
+                try:
+                    atlas.save(path, key)
+                except OSError:
+                    pass
+        return atlas
 
-    def draw(self, surface: pygame.Surface, camera_x: float):
-        sx = int(self.world_x - camera_x)
-        # El top Y es la base Y menos la altura de la imagen
-        sy = int(self.world_y_base - self.rect.height) 
-        surface.blit(self.image, (sx, sy))
 
-    def update_screen_pos(self, camera_x: float):
-        # Actualiza el rect en pantalla (para culling/limpieza)
-        sx = int(self.world_x - camera_x)
-        sy = int(self.world_y_base - self.rect.height)
-        self.rect.topleft = (sx, sy)
+_atlas = None
+def get_atlas() -> SpriteAtlas:
+    """Atlas compartido del proceso (se carga la primera vez)."""
+    global _atlas
+    if _atlas is None:
+        _atlas = SpriteAtlas.load_or_build()
+    else:
+        _atlas.convert() # Cargado antes de abrir la ventana
+    return _atlas
+
+# ------------------------------
+# SPRITES
+# ------------------------------
+# [MODIFICADO] Collectible y Decoration (un pygame.sprite.Sprite por entidad)
+# y su índice TileBuckets se sustituyen por EntityStore.
+
+# [NUEVO] Tipos de entidad; se guardan como su índice (un byte)
+SPAWN_KINDS = ('coin', 'fuel', 'nos', 'tree1', 'tree2')
+SPAWN_KIND_CODES = {kind: code for code, kind in enumerate(SPAWN_KINDS)}
+_COIN, _FUEL, _NOS, _TREE1, _TREE2 = range(len(SPAWN_KINDS))
+
+# [NUEVO] Subida de la moneda en cada fase del vaivén (se calcula una vez)
+_BOB_SCALE = COIN_BOB_STEPS / (2 * math.pi) # rad -> fase
+_BOB_OFFSETS = [int(COIN_BOB_PX * (0.5 + 0.5 * math.sin(k / _BOB_SCALE))) for k in range(COIN_BOB_STEPS)]
+
+
+class EntityStore:
+    """Entidades (coleccionables o árboles) en arrays paralelos, ordenadas por tile.
+
+    La entidad i es ``tiles[i]``, ``xs[i]``/``ys[i]`` (posición en el mundo),
+    ``kinds[i]`` (índice en SPAWN_KINDS), ``phases[i]`` (fase del vaivén) y
+    ``alive[i]``. Las imágenes se comparten por tipo. El mundo se puebla en
+    orden de tile, así que añadir es casi siempre un append; lo recogido
+    solo se marca como muerto y se borra al quedar atrás (``pop_before``).
+    ``tile in store`` indica si el tile tiene alguna entidad viva.
+
+    Cada frame, ``animate`` avanza las fases y ``layout`` calcula las
+    posiciones en pantalla de lo visible, en lote (con NumPy si está y el
+    rango tiene al menos ENTITY_VECTORIZE_MIN entidades);
+    ``draw`` y ``screen_bounds`` usan ese último layout.
+    """
+    FIELDS = ('tiles', 'xs', 'ys', 'kinds', 'phases', 'alive')
+    TYPECODES = ('i', 'i', 'i', 'b', 'f', 'b')
+
+    def __init__(self, images: dict):
+        self.images = [images.get(kind) for kind in SPAWN_KINDS]
+        self.sizes = [img.get_size() if img is not None else (0, 0) for img in self.images]
+        # Cuánto sube cada tipo sobre su y: los árboles, su altura (su y es la base)
+        self.lifts = [h if code >= _TREE1 else 0 for code, (_, h) in enumerate(self.sizes)]
+        self.vectorized = ENTITY_VECTORIZED and np is not None
+        if self.vectorized:
+            self.lifts_np = np.array(self.lifts, dtype=np.int64)
+            self.bob_np = np.array(_BOB_OFFSETS, dtype=np.int64)
+        self.clear()
+
+    def clear(self):
+        for name, typecode in zip(self.FIELDS, self.TYPECODES):
+            setattr(self, name, array(typecode))
+        self.count = 0 # Entidades vivas
+        # Último layout: índice, tipo y posición en pantalla de lo visible
+        self.view_idx, self.view_kinds, self.view_xs, self.view_ys = [], [], [], []
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __contains__(self, tile_idx: int) -> bool:
+        tiles, alive = self.tiles, self.alive
+        i = bisect_left(tiles, tile_idx)
+        while i < len(tiles) and tiles[i] == tile_idx:
+            if alive[i]:
+                return True
+            i += 1
+        return False
+
+    def add(self, tile_idx: int, kind: int, x: int, y: int):
+        values = (tile_idx, x, y, kind, 0.0, 1)
+        if not self.tiles or self.tiles[-1] <= tile_idx:
+            for name, value in zip(self.FIELDS, values):
+                getattr(self, name).append(value)
+        else:
+            i = bisect_right(self.tiles, tile_idx)
+            for name, value in zip(self.FIELDS, values):
+                getattr(self, name).insert(i, value)
+        self.count += 1
+
+    def span(self, first_tile: int, last_tile: int) -> range:
+        """Índices de las entidades de los tiles first_tile..last_tile (vivas o no)."""
+        return range(bisect_left(self.tiles, first_tile), bisect_right(self.tiles, last_tile))
+
+    def remove(self, i: int):
+        if self.alive[i]:
+            self.alive[i] = 0
+            self.count -= 1
+
+    def pop_before(self, tile_idx: int) -> int:
+        """Borra las entidades de los tiles anteriores a tile_idx; devuelve cuántas."""
+        n = bisect_left(self.tiles, tile_idx)
+        if n:
+            self.count -= sum(self.alive[:n])
+            for name in self.FIELDS:
+                del getattr(self, name)[:n]
+        return n
+
+    def nbytes(self) -> int:
+        return sum(len(a) * a.itemsize for a in (getattr(self, name) for name in self.FIELDS))
+
+    def _np(self, name: str):
+        # Vista NumPy sin copia (temporal: un array con vistas vivas no puede crecer)
+        a = getattr(self, name)
+        return np.frombuffer(a, dtype=a.typecode)
+
+    def animate(self, dt: float, first_tile: int, last_tile: int):
+        """Avanza la fase del vaivén de las monedas del rango de tiles."""
+        span = self.span(first_tile, last_tile)
+        step = COIN_BOB_SPEED * dt
+        if self.vectorized and len(span) >= ENTITY_VECTORIZE_MIN:
+            lo, hi = span.start, span.stop
+            phases = self._np('phases')[lo:hi]
+            coins = self._np('kinds')[lo:hi] == _COIN
+            # Suma en double y redondea a float32 al guardar, como el bucle con array('f')
+            phases[coins] = phases[coins].astype(np.float64) + step
+            return
+        kinds, phases = self.kinds, self.phases
+        for i in span:
+            if kinds[i] == _COIN:
+                phases[i] += step
+
+    def layout(self, camera_x: float, first_tile: int, last_tile: int) -> int:
+        """Posiciones en pantalla (esquina superior) de las entidades vivas del rango."""
+        span = self.span(first_tile, last_tile)
+        if self.vectorized and len(span) >= ENTITY_VECTORIZE_MIN:
+            lo, hi = span.start, span.stop
+            idx = np.flatnonzero(self._np('alive')[lo:hi]) + lo
+            kinds = self._np('kinds')[idx]
+            bob = self.bob_np[(self._np('phases')[idx].astype(np.float64) * _BOB_SCALE).astype(np.int64) % COIN_BOB_STEPS]
+            lift = np.where(kinds == _COIN, bob, self.lifts_np[kinds])
+            self.view_idx = idx.tolist()
+            self.view_kinds = kinds.tolist()
+            self.view_xs = (self._np('xs')[idx] - camera_x).astype(np.int64).tolist()
+            self.view_ys = (self._np('ys')[idx] - lift).tolist()
+            return len(self.view_idx)
+        kinds, xs, ys, phases, alive, lifts = self.kinds, self.xs, self.ys, self.phases, self.alive, self.lifts
+        view_idx, view_kinds, view_xs, view_ys = [], [], [], []
+        self.view_idx, self.view_kinds, self.view_xs, self.view_ys = view_idx, view_kinds, view_xs, view_ys
+        for i in span:
+            if not alive[i]:
+                continue
+            kind = kinds[i]
+            view_idx.append(i)
+            view_kinds.append(kind)
+            view_xs.append(int(xs[i] - camera_x))
+            if kind == _COIN:
+                view_ys.append(ys[i] - _BOB_OFFSETS[int(phases[i] * _BOB_SCALE) % COIN_BOB_STEPS])
+            else:
+                view_ys.append(ys[i] - lifts[kind])
+        return len(view_idx)
+
+    def draw(self, surface: pygame.Surface) -> int:
+        """Dibuja el último layout con una sola llamada a blits; devuelve cuántas entidades."""
+        images = self.images
+        surface.blits([(images[kind], (x, y)) for kind, x, y in zip(self.view_kinds, self.view_xs, self.view_ys)],
+                      doreturn=False)
+        return len(self.view_kinds)
+
+    # Zona de pantalla que puede ocupar cada entidad del último layout (incluye el vaivén)
+    def screen_bounds(self) -> list:
+        ys, sizes, lifts = self.ys, self.sizes, self.lifts
+        rects = []
+        for i, kind, x in zip(self.view_idx, self.view_kinds, self.view_xs):
+            w, h = sizes[kind]
+            bob = COIN_BOB_PX if kind == _COIN else 0
+            rects.append(pygame.Rect(x, ys[i] - lifts[kind] - bob, w, h + bob))
+        return rects
 
 
 # ------------------------------
 # TERRAIN (tiles planos con generación infinita)
 # ------------------------------
+# [NUEVO] Límites del tipo 'h' (int16) usado para guardar las alturas
+HEIGHT_MIN, HEIGHT_MAX = -32768, 32767
+
+
+def _clamp_height(y) -> int:
+    return min(HEIGHT_MAX, max(HEIGHT_MIN, int(y)))
+
+
+# [NUEVO] Generación determinista por chunk: cada chunk sale de (seed, índice)
+# más la altura de su primer tile, así se puede generar en cualquier orden
+# y reconstruir después de descartarlo.
+def chunk_rng(seed: int, chunk_idx: int, salt: int = 0) -> random.Random:
+    # salt separa flujos distintos para el mismo chunk (terreno = 0, spawns = 1)
+    return random.Random((salt << 64) | (seed << 32) | chunk_idx)
+
+
+def generate_intro_chunk(seed: int, chunk_idx: int, chunk_tiles: int, base_y: int,
+                         chance: float = 0.04) -> Tuple[List[int], int]:
+    """Chunk del tramo inicial: plano con subidas cortas. Devuelve (alturas, y del siguiente chunk)."""
+    rng = chunk_rng(seed, chunk_idx)
+    heights = [base_y] * chunk_tiles
+    # Las rampas empiezan en i >= 1 para que el primer tile sea siempre base_y
+    i = 1
+    while i < chunk_tiles - 1:
+        if rng.random() < chance:
+            length = rng.randint(4, 12)
+            height_change = rng.randint(-48, -12) # Solo subidas
+            ramp_base = heights[i-1]
+            for r in range(length):
+                idx = i + r
+                if idx >= chunk_tiles:
+                    break
+                frac = (r + 1) / length
+                slope = int(frac * height_change)
+                jitter = rng.randint(-2, 2)
+                heights[idx] = ramp_base + slope + jitter
+            i += length
+        else:
+            i += 1
+    return heights, base_y
+
+
+def generate_terrain_chunk(seed: int, chunk_idx: int, chunk_tiles: int,
+                           start_y: int) -> Tuple[List[int], int]:
+    """Chunk procedural (rampas + jitter) que empieza en start_y.
+
+    Genera chunk_tiles + 1 alturas: la última es el primer tile del chunk
+    siguiente y se devuelve aparte como estado de frontera.
+    """
+    rng = chunk_rng(seed, chunk_idx)
+    heights = [start_y]
+    count = chunk_tiles + 1
+    while len(heights) < count:
+        if rng.random() < 0.08: # Aumento la chance de rampas
+            length = rng.randint(6, 18) # Rampas más largas
+            height_change = rng.choice([
+                rng.randint(-150, -48), # Subida significativa
+                rng.randint(48, 150) # Bajada significativa
+            ])
+            for r in range(length):
+                if len(heights) >= count:
+                    break
+                frac = r / length
+                slope = int(frac * height_change)
+                if r > 0:
+                    max_change = 10
+                    if abs(slope) > max_change:
+                        slope = int(math.copysign(max_change, slope))
+                jitter = rng.randint(-2, 2)
+                heights.append(heights[-1] + slope + jitter)
+            continue
+
+        # normal tile
+        jitter = rng.randint(-2, 2)
+        max_flat_change = 4
+        if abs(jitter) > max_flat_change:
+            jitter = int(math.copysign(max_flat_change - 1, jitter))
+        heights.append(heights[-1] + jitter)
+    return heights[:chunk_tiles], heights[chunk_tiles]
+
+
+def _mix64(x):
+    """Hash splitmix64 sobre un array uint64 (generador basado en contador)."""
+    x = x + np.uint64(0x9E3779B97F4A7C15)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def generate_terrain_chunks_np(seed: int, first_chunk: int, count: int, chunk_tiles: int,
+                               start_y: int):
+    """Versión NumPy de generate_terrain_chunk para count chunks seguidos.
+
+    Todos los sorteos salen de un hash de (seed, chunk, posición): se
+    calculan de una vez los segmentos (rampa o tile normal), sus longitudes
+    y alturas y el jitter de cada tile, y las pendientes y los topes de
+    10 px / 4 px se aplican como operaciones sobre arrays. Devuelve las
+    alturas (count x chunk_tiles) y la y inicial del chunk siguiente a cada
+    uno. Con la misma semilla el terreno no es idéntico al de la versión en
+    Python, pero sí lo es entre llamadas con distinto count.
+    """
+    n = chunk_tiles # Diferencias entre alturas consecutivas por chunk
+    chunk_ids = np.arange(first_chunk, first_chunk + count, dtype=np.uint64)
+    counter = ((np.uint64(seed & 0xFFFFFFFF) << np.uint64(32)) | chunk_ids)[:, None] * np.uint64(n)
+    bits = _mix64(counter + np.arange(n, dtype=np.uint64))
+    field = lambda shift: ((bits >> np.uint64(shift)) & np.uint64(0xFFFF)).astype(np.int64)
+
+    # Segmentos de cada chunk: una rampa (6..18 tiles) o un tile normal
+    is_ramp = field(0) < int(0.08 * 0x10000) # Aumento la chance de rampas
+    seg_len = np.where(is_ramp, field(16) % 13 + 6, 1) # Rampas más largas
+    height_change = (field(32) % 103 + 48) * np.where(field(48) & 1, 1, -1)
+    seg_start = np.minimum(np.cumsum(seg_len, axis=1) - seg_len, n)
+
+    # Para cada tile: su segmento (búsqueda sobre todos los chunks a la vez,
+    # desplazando cada fila para que quede ordenada) y su posición r en él
+    row_offset = (np.arange(count) * (n + 1))[:, None]
+    tile_pos = np.arange(n)
+    flat_seg = np.searchsorted((seg_start + row_offset).ravel(), (tile_pos + row_offset).ravel(), side='right') - 1
+    r = tile_pos - seg_start.ravel()[flat_seg].reshape(count, n)
+    seg_len_t = seg_len.ravel()[flat_seg].reshape(count, n)
+    ramp_tile = is_ramp.ravel()[flat_seg].reshape(count, n)
+    slope = (r * height_change.ravel()[flat_seg].reshape(count, n) / seg_len_t).astype(np.int64) # int() trunca hacia 0
+    slope = np.where(ramp_tile, np.minimum(np.maximum(slope, -10), 10), 0)
+
+    jitter = (field(48) >> 1) % 5 - 2
+    max_flat_change = 4
+    flat_jitter = np.where(np.abs(jitter) > max_flat_change, np.sign(jitter) * (max_flat_change - 1), jitter)
+    deltas = slope + np.where(ramp_tile, jitter, flat_jitter)
+
+    after = np.cumsum(deltas.ravel()).reshape(count, n) + start_y # Altura tras cada diferencia
+    heights = np.empty((count, n), dtype=np.int64)
+    heights[:, 0] = start_y
+    heights[1:, 0] = after[:-1, -1]
+    heights[:, 1:] = after[:, :-1]
+    return heights, after[:, -1]
+
+
+def generate_terrain_chunk_np(seed: int, chunk_idx: int, chunk_tiles: int,
+                              start_y: int) -> Tuple[array, int]:
+    heights, next_y = generate_terrain_chunks_np(seed, chunk_idx, 1, chunk_tiles, start_y)
+    return _to_height_array(heights[0]), int(next_y[0])
+
+
+def _to_height_array(heights) -> array:
+    chunk = array('h')
+    chunk.frombytes(np.clip(heights, HEIGHT_MIN, HEIGHT_MAX).astype(np.int16).tobytes())
+    return chunk
+
+
+class TileChunks:
+    """Alturas de los tiles guardadas en chunks de tamaño fijo (array('h')).
+
+    Se usa como la antigua lista ``Terrain.tiles``: ``len()`` es la frontera
+    de tiles generados y se indexa igual (también con negativos). Leer más
+    allá de la frontera genera el chunk sin moverla. Los chunks que quedan
+    detrás de la cámara se descartan con ``evict_before``; si se vuelven a
+    leer, ``loader`` los reconstruye.
+    """
+    def __init__(self, chunk_tiles: int, loader):
+        self.chunk_tiles = chunk_tiles
+        self.loader = loader # índice de chunk -> array('h')
+        self.chunks = {} # índice de chunk -> array('h')
+        self.length = 0
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __getitem__(self, idx: int) -> int:
+        if idx < 0:
+            idx += self.length
+            if idx < 0:
+                raise IndexError(f"tile {idx - self.length} fuera de rango (len={self.length})")
+        chunk_idx, offset = divmod(idx, self.chunk_tiles)
+        return self.chunk(chunk_idx)[offset]
+
+    def chunk(self, chunk_idx: int) -> array:
+        chunk = self.chunks.get(chunk_idx)
+        if chunk is None:
+            chunk = self.chunks[chunk_idx] = self.loader(chunk_idx)
+        return chunk
+
+    def extend_to(self, length: int):
+        """Avanza la frontera hasta el final del chunk que contiene length - 1."""
+        if length <= self.length:
+            return
+        last_chunk = (length - 1) // self.chunk_tiles
+        for chunk_idx in range(self.length // self.chunk_tiles, last_chunk + 1):
+            if chunk_idx not in self.chunks:
+                self.chunks[chunk_idx] = self.loader(chunk_idx)
+        self.length = (last_chunk + 1) * self.chunk_tiles
+
+    def evict_before(self, tile_idx: int):
+        """Descarta los chunks que terminan antes de tile_idx."""
+        first_kept = tile_idx // self.chunk_tiles
+        for chunk_idx in [c for c in self.chunks if c < first_kept]:
+            del self.chunks[chunk_idx]
+
+    def truncate(self, length: int):
+        """Recorta la frontera a length tiles (redondeado al chunk)."""
+        length = -(-length // self.chunk_tiles) * self.chunk_tiles
+        if length >= self.length:
+            return
+        for chunk_idx in [c for c in self.chunks if c * self.chunk_tiles >= length]:
+            del self.chunks[chunk_idx]
+        self.length = length
+
+    def nbytes(self) -> int:
+        """Bytes ocupados por las alturas residentes."""
+        return sum(c.itemsize * len(c) for c in self.chunks.values())
+
+
+# [NUEVO] Tablas precalculadas por chunk para consultar el suelo
+class TerrainLUT(NamedTuple):
+    """Alturas, pendientes y normales de los tiles de un chunk.
+
+    ``slopes[i]`` es la diferencia de altura entre el tile i y el siguiente
+    (el último usa el primer tile del chunk siguiente), así que la altura
+    dentro de un tile es ``heights[i] + slopes[i] * t``. Las normales son
+    unitarias y apuntan hacia arriba (y negativa).
+    """
+    heights: array
+    slopes: array
+    normal_x: array
+    normal_y: array
+
+
+def build_chunk_lut(heights: array, next_y: int, tile_size: int = TILE_SIZE) -> TerrainLUT:
+    slopes = array('i', [b - a for a, b in zip(heights, heights[1:])])
+    slopes.append(next_y - heights[-1])
+    normal_x = array('f')
+    normal_y = array('f')
+    for dy in slopes:
+        # Tangente (tile_size, dy) -> normal (dy, -tile_size) normalizada
+        length = math.hypot(dy, tile_size)
+        normal_x.append(dy / length)
+        normal_y.append(-tile_size / length)
+    return TerrainLUT(heights, slopes, normal_x, normal_y)
+
+
 class Terrain:
-    def __init__(self, tile_size:int, initial_tiles:int, base_y:int, ground_img:pygame.Surface):
+    def __init__(self, tile_size:int, initial_tiles:int, base_y:int, ground_img:pygame.Surface,
+                 chunk_tiles: int = TERRAIN_CHUNK_TILES, retention_chunks: int = TERRAIN_RETENTION_CHUNKS,
+                 seed: int = None, vectorized: bool = TERRAIN_VECTORIZED):
         self.tile_size = tile_size
         self.base_y = base_y
-        self.tiles = [self.base_y for _ in range(initial_tiles)]
+        self.initial_tiles = initial_tiles
+        self.retention_chunks = retention_chunks
+        self.seed = seed if seed is not None else random.getrandbits(32)
+        self.chunk_tiles = chunk_tiles
+        self.vectorized = vectorized and np is not None
+        # Chunks del tramo inicial (plano con subidas), redondeado a chunks completos
+        self.intro_chunks = -(-initial_tiles // chunk_tiles)
+        # Estado de frontera: altura del primer tile de cada chunk ya conocido
+        self.chunk_starts = array('h', [base_y])
+        self.tiles = TileChunks(chunk_tiles, self.build_chunk)
+        self.tiles.extend_to(initial_tiles)
+        self.luts = {} # [NUEVO] índice de chunk -> TerrainLUT (se crean al consultar)
         self.ground_img = ground_img
-        self.add_random_ramps(0, initial_tiles, chance=0.04)
+        self.render_cache = None # [NUEVO] TerrainStripCache, se crea al dibujar
+
+    def _generate(self, chunk_idx: int, start_y: int) -> Tuple[List[int], int]:
+        if chunk_idx < self.intro_chunks:
+            return generate_intro_chunk(self.seed, chunk_idx, self.chunk_tiles, self.base_y)
+        if self.vectorized:
+            return generate_terrain_chunk_np(self.seed, chunk_idx, self.chunk_tiles, start_y)
+        return generate_terrain_chunk(self.seed, chunk_idx, self.chunk_tiles, start_y)
+
+    def chunk_start_y(self, chunk_idx: int) -> int:
+        # Las fronteras se calculan una vez en orden y se conservan aunque
+        # el chunk se descarte (2 bytes por chunk)
+        starts = self.chunk_starts
+        while len(starts) <= chunk_idx:
+            k = len(starts) - 1
+            if self.vectorized and k >= self.intro_chunks:
+                _, next_ys = generate_terrain_chunks_np(self.seed, k, chunk_idx - k, self.chunk_tiles, starts[k])
+                starts.extend(_clamp_height(y) for y in next_ys)
+                continue
+            _, next_y = self._generate(k, starts[k])
+            starts.append(_clamp_height(next_y))
+        return starts[chunk_idx]
+
+    def generate_heights(self, chunk_idx: int, start_y: int) -> Tuple[array, int]:
+        """Alturas de un chunk dado su primer tile. No toca el estado del terreno
+        (se puede llamar desde otro hilo)."""
+        heights, next_y = self._generate(chunk_idx, start_y)
+        if not isinstance(heights, array):
+            heights = array('h', [_clamp_height(y) for y in heights])
+        return heights, _clamp_height(next_y)
+
+    def build_chunk(self, chunk_idx: int) -> array:
+        """Genera (o reconstruye) las alturas de un chunk cualquiera."""
+        heights, next_y = self.generate_heights(chunk_idx, self.chunk_start_y(chunk_idx))
+        if len(self.chunk_starts) == chunk_idx + 1:
+            self.chunk_starts.append(next_y)
+        return heights
+
+    # [NUEVO] Añade un chunk generado fuera (hilo de pre-generación) y avanza la frontera
+    def attach_chunk(self, chunk_idx: int, heights: array, next_y: int):
+        self.tiles.chunks.setdefault(chunk_idx, heights)
+        if len(self.chunk_starts) == chunk_idx + 1:
+            self.chunk_starts.append(next_y)
+        self.tiles.extend_to((chunk_idx + 1) * self.chunk_tiles)
+
+    # [NUEVO] Con NumPy, los chunks procedurales que faltan en [first, last]
+    # se generan en una sola llamada vectorizada
+    def build_chunks(self, first: int, last: int):
+        first = max(first, self.intro_chunks)
+        missing = [k for k in range(first, last + 1) if k not in self.tiles.chunks]
+        if not missing:
+            return
+        first = missing[0]
+        count = last - first + 1
+        heights, next_ys = generate_terrain_chunks_np(
+            self.seed, first, count, self.chunk_tiles, self.chunk_start_y(first))
+        for i in range(count):
+            k = first + i
+            if len(self.chunk_starts) == k + 1:
+                self.chunk_starts.append(_clamp_height(next_ys[i]))
+            if k not in self.tiles.chunks:
+                self.tiles.chunks[k] = _to_height_array(heights[i])
 
     def tile_y_at_pixel_x(self, world_x_px:int) -> int:
         tile_idx = max(0, world_x_px // self.tile_size)
@@ -209,124 +964,235 @@ class Terrain:
 
     # [MODIFICADO] Eliminado terrain_angle_at_pixel_x, ya no se usa
     
-    # [MODIFICADO] Mantenido, es crucial para la física suave en Y
-    def terrain_interpolated_y(self, world_x_px: int) -> int:
-        tile_idx = max(0, world_x_px // self.tile_size)
-        if tile_idx + 1 >= len(self.tiles):
+    # [NUEVO] Tabla de alturas/pendientes/normales de un chunk
+    def chunk_lut(self, chunk_idx: int) -> TerrainLUT:
+        lut = self.luts.get(chunk_idx)
+        if lut is None:
+            heights = self.tiles.chunk(chunk_idx)
+            lut = self.luts[chunk_idx] = build_chunk_lut(
+                heights, self.chunk_start_y(chunk_idx + 1), self.tile_size)
+        return lut
+
+    def _locate(self, world_x_px: int) -> Tuple[TerrainLUT, int, int]:
+        # (tabla del chunk, tile dentro del chunk, x dentro del tile)
+        tile_idx, x_in_tile = divmod(max(0, world_x_px), self.tile_size)
+        if tile_idx + 1 >= self.tiles.length:
             self.ensure_tiles(tile_idx + 1)
+        chunk_idx, offset = divmod(tile_idx, self.chunk_tiles)
+        lut = self.luts.get(chunk_idx) or self.chunk_lut(chunk_idx)
+        return lut, offset, x_in_tile
 
-        y0 = self.tiles[tile_idx]
-        y1 = self.tiles[tile_idx + 1]
-        
+    # [MODIFICADO] Mantenido, es crucial para la física suave en Y.
+    # Ahora lee la altura y la pendiente del tile en la tabla del chunk.
+    def terrain_interpolated_y(self, world_x_px: int) -> int:
+        lut, offset, x_in_tile = self._locate(world_x_px)
         # Posición relativa dentro del tile (0 a 1)
-        t = (world_x_px % self.tile_size) / self.tile_size
-        
-        interpolated_y = y0 + (y1 - y0) * t
-        return int(interpolated_y)
+        return int(lut.heights[offset] + lut.slopes[offset] * (x_in_tile / self.tile_size))
+
+    # [NUEVO] Pendiente del suelo (dy/dx, positiva cuesta abajo) y normal unitaria
+    def slope_at(self, world_x_px: int) -> float:
+        lut, offset, _ = self._locate(world_x_px)
+        return lut.slopes[offset] / self.tile_size
+
+    def normal_at(self, world_x_px: int) -> Tuple[float, float]:
+        lut, offset, _ = self._locate(world_x_px)
+        return lut.normal_x[offset], lut.normal_y[offset]
+
+    # [NUEVO] Consultas en lote: alturas (o pendientes, normales) en N posiciones.
+    # Con NumPy son operaciones sobre arrays; sin él, un bucle sobre las tablas.
+    # Devuelven lo mismo en los dos casos (array('i'), array('d'), dos array('f')).
+    def heights_at(self, xs) -> array:
+        """Alturas interpoladas en las x dadas."""
+        if np is not None:
+            tiles, x_in_tile, heights, slopes = self._gather(xs, 'heights', 'slopes')
+            ys = (heights + slopes * (x_in_tile / self.tile_size)).astype(np.int32)
+            return array('i', ys.tobytes())
+        return array('i', [self.terrain_interpolated_y(x) for x in xs])
+
+    def slopes_at(self, xs) -> array:
+        if np is not None:
+            _, _, slopes = self._gather(xs, 'slopes')
+            return array('d', (slopes / self.tile_size).tobytes())
+        return array('d', [self.slope_at(x) for x in xs])
+
+    def normals_at(self, xs) -> Tuple[array, array]:
+        """(nx, ny): dos arrays paralelos a xs."""
+        if np is not None:
+            _, _, nx, ny = self._gather(xs, 'normal_x', 'normal_y')
+            return array('f', nx.tobytes()), array('f', ny.tobytes())
+        nx, ny = array('f'), array('f')
+        for x in xs:
+            normal = self.normal_at(x)
+            nx.append(normal[0])
+            ny.append(normal[1])
+        return nx, ny
+
+    def _gather(self, xs, *fields):
+        # Junta las tablas de los chunks que cubren xs y las indexa de una vez
+        xs = np.maximum(np.asarray(xs, dtype=np.int64), 0)
+        tiles, x_in_tile = np.divmod(xs, self.tile_size)
+        if len(xs) == 0:
+            return (tiles, x_in_tile) + tuple(
+                np.zeros(0, dtype=np.float32 if field.startswith('normal') else np.int64) for field in fields)
+        last_tile = int(tiles.max())
+        if last_tile + 1 >= self.tiles.length:
+            self.ensure_tiles(last_tile + 1)
+        first_chunk = int(tiles.min()) // self.chunk_tiles
+        luts = [self.chunk_lut(k) for k in range(first_chunk, last_tile // self.chunk_tiles + 1)]
+        idx = tiles - first_chunk * self.chunk_tiles
+        columns = []
+        for field in fields:
+            dtype = np.float32 if field.startswith('normal') else np.int64
+            table = np.concatenate([np.frombuffer(getattr(lut, field), dtype=getattr(lut, field).typecode)
+                                    for lut in luts]).astype(dtype)
+            columns.append(table[idx])
+        return (tiles, x_in_tile) + tuple(columns)
 
     def ensure_tiles(self, idx: int):
+        # [MODIFICADO] Se genera por chunks completos
         if idx < len(self.tiles):
             return
-        
-        # generar en chunks para eficiencia
-        while len(self.tiles) <= idx:
-            # Generar el terreno faltante usando la lógica de chunks (rampas)
-            self.generate_chunk(100)
+        if self.vectorized:
+            self.build_chunks(len(self.tiles) // self.chunk_tiles, idx // self.chunk_tiles)
+        self.tiles.extend_to(idx + 1)
     
     def generate_chunk(self, count:int):
-        i = 0
-        while i < count:
-            if random.random() < 0.08: # Aumento la chance de rampas
-                length = random.randint(6, 18) # Rampas más largas
-                height_change = random.choice([
-                    random.randint(-150, -48), # Subida significativa
-                    random.randint(48, 150) # Bajada significativa
-                ])
-                for r in range(length):
-                    if i >= count:
-                        break
-                    
-                    frac = r / length
-                    slope = int(frac * height_change)
-                    
-                    base_y = self.tiles[-1] if self.tiles else self.base_y
-                    
-                    new_y = base_y + slope
-                    
-                    if r > 0:
-                        prev_y = self.tiles[-1]
-                        max_change = 10
-                        if abs(new_y - prev_y) > max_change:
-                            new_y = prev_y + math.copysign(max_change, new_y - prev_y)
-                    
-                    jitter = random.randint(-2, 2)
-                    self.tiles.append(new_y + jitter)
-                    i += 1
-                continue
-            
-            # normal tile
-            base_y = self.tiles[-1] if self.tiles else self.base_y
-            jitter = random.randint(-2, 2)
-            max_flat_change = 4
-            if abs(base_y + jitter - self.tiles[-1]) > max_flat_change:
-                jitter = math.copysign(max_flat_change - 1, base_y + jitter - self.tiles[-1])
-            
-            self.tiles.append(base_y + jitter)
-            i += 1
-            
-    def add_random_ramps(self, start_idx:int = 0, end_idx: int = None, chance: float = 0.02):
-        if end_idx is None:
-            end_idx = len(self.tiles)
-        i = start_idx
-        while i < end_idx - 1:
-            if random.random() < chance:
-                length = random.randint(4, 12)
-                height_change = random.randint(-48, -12) # Solo subidas
-                for r in range(length):
-                    idx = i + r
-                    if idx >= end_idx:
-                        break
-                    
-                    frac = (r + 1) / length
-                    slope = int(frac * height_change)
-                    jitter = random.randint(-2, 2)
-                    
-                    base_y = self.tiles[i-1] if i > 0 else self.base_y 
-                    
-                    self.tiles[idx] = base_y + slope + jitter
-                i += length
-            else:
-                i += 1
+        # [MODIFICADO] Avanza la frontera al menos count tiles (chunks completos)
+        self.ensure_tiles(len(self.tiles) + count - 1)
+
+    # [NUEVO] Descarta los chunks que quedaron detrás de la cámara.
+    # Se reconstruyen desde la semilla si se vuelven a necesitar.
+    def evict_behind(self, camera_tile: int):
+        keep_from = (camera_tile // self.chunk_tiles - self.retention_chunks) * self.chunk_tiles
+        self.tiles.evict_before(keep_from)
+        self._drop_stale_luts()
+
+    def _drop_stale_luts(self):
+        for chunk_idx in [k for k in self.luts if k not in self.tiles.chunks]:
+            del self.luts[chunk_idx]
+
+    # [NUEVO] Vuelve la frontera al terreno inicial; lo que sigue es el mismo
+    # terreno (misma semilla) y se vuelve a poblar al avanzar
+    def reset(self):
+        self.tiles.truncate(self.initial_tiles)
+        self._drop_stale_luts()
     
+    # [NUEVO] Imagen superior de un tile (calle o tierra)
+    def top_image(self, tile_idx: int, street_img: pygame.Surface = None) -> pygame.Surface:
+        # [MODIFICADO] Lógica de dibujado mantenida, pero STREET_FULL_LENGTH = True
+        # asegura que 'calle.png' (street_img) se use siempre arriba.
+        used_top_img = None
+        if street_img is not None and STREET_FULL_LENGTH:
+            used_top_img = street_img
+        elif tile_idx < INITIAL_STREET_TILES and street_img is not None:
+            used_top_img = street_img
+        return used_top_img if used_top_img else self.ground_img
+
+    # [NUEVO] Una columna: tile superior en ty y tierra por debajo hasta bottom
+    def draw_column(self, surf: pygame.Surface, tile_idx: int, screen_x: int, ty: int,
+                    street_img: pygame.Surface, bottom: int):
+        surf.blit(self.top_image(tile_idx, street_img), (screen_x, ty))
+
+        # Dibujar el resto del terreno por debajo (ground.png)
+        y = ty + self.tile_size
+        while y < bottom:
+            surf.blit(self.ground_img, (screen_x, y))
+            y += self.tile_size
+
     def draw(self, surf:pygame.Surface, camera_x:float, player_tile: int = None, street_img: pygame.Surface = None):
+        # [NUEVO] Con caché, el terreno son una o dos franjas ya compuestas
+        if TERRAIN_RENDER_CACHE:
+            cache = self.render_cache
+            if cache is None or not cache.matches(surf, street_img):
+                cache = self.render_cache = TerrainStripCache(self, surf, street_img)
+            cache.draw(surf, camera_x)
+            return
+
         screen_tile_start = int(camera_x) // self.tile_size
         offset_x = int(camera_x) % self.tile_size
         tiles_on_screen = surf.get_width() // self.tile_size + 3
         
         for i in range(tiles_on_screen):
             tile_idx = screen_tile_start + i
-            if tile_idx >= len(self.tiles):
-                self.generate_chunk(50) 
-            
+            # [MODIFICADO] Ya no se genera terreno aquí: el streaming lo mantiene
+            # por delante de la cámara (y un chunk que falte se lee igual)
             ty = self.tiles[tile_idx]
             screen_x = i * self.tile_size - offset_x
-            
-            # [MODIFICADO] Lógica de dibujado mantenida, pero STREET_FULL_LENGTH = True
-            # asegura que 'calle.png' (street_img) se use siempre arriba.
-            used_top_img = None
-            if street_img is not None and STREET_FULL_LENGTH:
-                used_top_img = street_img
-            elif tile_idx < INITIAL_STREET_TILES and street_img is not None:
-                used_top_img = street_img
-            
-            top_img = used_top_img if used_top_img else self.ground_img
-            surf.blit(top_img, (screen_x, ty))
-
-            # Dibujar el resto del terreno por debajo (ground.png)
-            y = ty + self.tile_size
-            while y < surf.get_height():
-                surf.blit(self.ground_img, (screen_x, y))
-                y += self.tile_size
+            self.draw_column(surf, tile_idx, screen_x, ty, street_img, surf.get_height())
+
+
+class TerrainStripCache:
+    """Franjas de terreno pre-dibujadas de strip_tiles tiles de ancho.
+
+    Cada franja se compone una vez (calle arriba, tierra debajo, con la
+    altura de cada tile) en una superficie con colorkey; dibujar el
+    terreno es entonces blitear las una o dos franjas visibles. Las franjas
+    que quedan detrás de la cámara se descartan, y si se supera max_bytes
+    se descartan las menos usadas.
+    """
+    COLORKEY = (255, 0, 254) # Color transparente (por encima del terreno)
+
+    def __init__(self, terrain: 'Terrain', target: pygame.Surface, street_img: pygame.Surface,
+                 strip_tiles: int = TERRAIN_STRIP_TILES, max_bytes: int = TERRAIN_STRIP_CACHE_BYTES):
+        self.terrain = terrain
+        self.target = target
+        self.height = target.get_height()
+        self.street_img = street_img
+        self.strip_tiles = strip_tiles
+        self.strip_w = strip_tiles * terrain.tile_size
+        self.max_bytes = max_bytes
+        self.strips = OrderedDict() # índice de franja -> (superficie o None, y superior)
+        self.nbytes = 0
+        self.built = 0
+
+    def matches(self, target: pygame.Surface, street_img: pygame.Surface) -> bool:
+        return target.get_height() == self.height and street_img is self.street_img
+
+    def _build(self, strip_idx: int):
+        terrain = self.terrain
+        first_tile = strip_idx * self.strip_tiles
+        tys = [terrain.tiles[first_tile + i] for i in range(self.strip_tiles)]
+        top = max(0, min(tys))
+        if top >= self.height:
+            return None, top # Todo el terreno queda por debajo de la pantalla
+        strip = pygame.Surface((self.strip_w, self.height - top), 0, self.target)
+        strip.fill(self.COLORKEY)
+        for i, ty in enumerate(tys):
+            terrain.draw_column(strip, first_tile + i, i * terrain.tile_size, ty - top,
+                                self.street_img, self.height - top)
+        strip.set_colorkey(self.COLORKEY, pygame.RLEACCEL)
+        self.built += 1
+        return strip, top
+
+    def _strip_bytes(self, strip) -> int:
+        return strip.get_width() * strip.get_height() * strip.get_bytesize() if strip else 0
+
+    def get(self, strip_idx: int):
+        entry = self.strips.get(strip_idx)
+        if entry is not None:
+            self.strips.move_to_end(strip_idx)
+            return entry
+        entry = self.strips[strip_idx] = self._build(strip_idx)
+        self.nbytes += self._strip_bytes(entry[0])
+        while self.nbytes > self.max_bytes and len(self.strips) > 1:
+            _, (old, _) = self.strips.popitem(last=False)
+            self.nbytes -= self._strip_bytes(old)
+        return entry
+
+    def evict_before(self, strip_idx: int):
+        for k in [k for k in self.strips if k < strip_idx]:
+            old, _ = self.strips.pop(k)
+            self.nbytes -= self._strip_bytes(old)
+
+    def draw(self, surf: pygame.Surface, camera_x: float):
+        cam = int(camera_x)
+        first = cam // self.strip_w
+        last = (cam + surf.get_width() - 1) // self.strip_w
+        self.evict_before(first)
+        for k in range(first, last + 1):
+            strip, top = self.get(k)
+            if strip is not None:
+                surf.blit(strip, (k * self.strip_w - cam, top))
 
 
 # ------------------------------
@@ -371,6 +1237,7 @@ class Player:
         
         # Posición inicial
         self.world_x = self.screen_x
+        self.prev_world_y = self.world_y
         # [MODIFICADO] Pasa la Y (base) a set_position
         self.car_body.set_position(self.screen_x, int(self.world_y))
 
@@ -379,7 +1246,9 @@ class Player:
 
     # [MODIFICADO] Método update reescrito para física 2D simple
     def update(self, dt: float, keys: List[bool], terrain: 'Terrain'):
-        
+        # [NUEVO] Base del paso anterior (para interpolar el dibujo)
+        self.prev_world_y = self.world_y
+
         # --- Lógica de NOS
         if self.nos_time_left > 0:
             self.nos_time_left -= dt
@@ -436,10 +1305,12 @@ class Player:
             self.velocity_x += force_x * dt
 
         # Aplicar fricción/resistencia
+        # [MODIFICADO] Los factores están ajustados por frame a 60 FPS: se
+        # escalan con dt para que no dependan de la frecuencia de pasos
         if self.on_ground:
-            self.velocity_x *= FRICTION_GROUND
+            self.velocity_x *= FRICTION_GROUND ** (dt * 60)
         else:
-            self.velocity_x *= AIR_RESISTANCE
+            self.velocity_x *= AIR_RESISTANCE ** (dt * 60)
             
         # Actualizar posición X
         self.world_x += self.velocity_x * dt
@@ -467,16 +1338,76 @@ class Player:
 # ------------------------------
 # ... (HUD, Button sin cambios) ...
 
+# [NUEVO] Fuentes, overlays y textos se crean una vez y se reutilizan
+class UIResources:
+    """Recursos de UI compartidos.
+
+    ``font`` y ``overlay`` se crean la primera vez que se piden; ``text``
+    guarda los textos renderizados por (fuente, texto, color) con expulsión
+    LRU. ``allocations`` cuenta las superficies creadas (en total y en el
+    último frame) para comprobar que un frame sin cambios no crea ninguna.
+    """
+    def __init__(self, max_texts: int = TEXT_CACHE_SIZE):
+        self.max_texts = max_texts
+        self.fonts = {}
+        self.overlays = {}
+        self.texts = OrderedDict()
+        self.allocations = 0
+        self.frame_allocations = 0
+        self.last_frame_allocations = 0
+
+    def begin_frame(self):
+        self.last_frame_allocations = self.frame_allocations
+        self.frame_allocations = 0
+
+    def _allocated(self):
+        self.allocations += 1
+        self.frame_allocations += 1
+
+    def font(self, name: str, size: int, bold: bool = False) -> pygame.font.Font:
+        key = (name, size, bold)
+        font = self.fonts.get(key)
+        if font is None:
+            font = self.fonts[key] = load_font(name, size, bold=bold) # [MODIFICADO] Ruta en caché
+        return font
+
+    def overlay(self, size: Tuple[int, int], rgba: Tuple[int, int, int, int]) -> pygame.Surface:
+        key = (size, rgba)
+        surf = self.overlays.get(key)
+        if surf is None:
+            surf = self.overlays[key] = pygame.Surface(size, pygame.SRCALPHA)
+            surf.fill(rgba)
+            self._allocated()
+        return surf
+
+    def text(self, font: pygame.font.Font, text: str, color) -> pygame.Surface:
+        key = (font, text, tuple(color))
+        surf = self.texts.get(key)
+        if surf is not None:
+            self.texts.move_to_end(key)
+            return surf
+        surf = self.texts[key] = font.render(text, True, color)
+        self._allocated()
+        if len(self.texts) > self.max_texts:
+            self.texts.popitem(last=False)
+        return surf
+
+
 class HUD:
-    def __init__(self, font:pygame.font.Font):
+    # [NUEVO] Zona de pantalla donde dibuja el HUD (para el render parcial)
+    AREA = pygame.Rect(0, 0, SCREEN_W, 120)
+
+    def __init__(self, font:pygame.font.Font, ui: UIResources = None):
         self.font = font
+        self.ui = ui if ui is not None else UIResources()
 
     def draw(self, surf:pygame.Surface, player:Player):
+        # [MODIFICADO] Los textos salen de la caché: solo se renderizan al cambiar
         # Monedas
-        txt = self.font.render(f"Monedas: {player.coins}", True, (255,215,0))
+        txt = self.ui.text(self.font, f"Monedas: {player.coins}", (255,215,0))
         surf.blit(txt, (20, 20))
         # Distancia
-        dist_txt = self.font.render(f"Distancia: {int(player.world_x / 100)}m", True, (255, 255, 255))
+        dist_txt = self.ui.text(self.font, f"Distancia: {int(player.world_x / 100)}m", (255, 255, 255))
         surf.blit(dist_txt, (SCREEN_W - dist_txt.get_width() - 20, 20))
         
         # Barra de fuel
@@ -486,157 +1417,591 @@ class HUD:
         col = (255, 60, 60) if player.fuel < 30 else (0,160,0)
         pygame.draw.rect(surf, col, (bx + 2, by + 2, fill, bh - 4))
         # Porcentaje
-        perc = self.font.render(f"{int(player.fuel)}%", True, (255,255,255))
+        perc = self.ui.text(self.font, f"{int(player.fuel)}%", (255,255,255))
         surf.blit(perc, (bx + bw + 10, by - 1))
         # NOS status
         if getattr(player, 'nos_time_left', 0.0) > 0:
-            nos_txt = self.font.render(f"NOS: {int(player.nos_time_left)}s", True, (120,200,255))
+            nos_txt = self.ui.text(self.font, f"NOS: {int(player.nos_time_left)}s", (120,200,255))
             surf.blit(nos_txt, (20, 90))
 
 
 class Button:
-    def __init__(self, rect:pygame.Rect, text:str, font:pygame.font.Font, bg=(40,40,40), fg=(255,255,255)):
+    def __init__(self, rect:pygame.Rect, text:str, font:pygame.font.Font, bg=(40,40,40), fg=(255,255,255),
+                 ui: UIResources = None):
         self.rect = rect
         self.text = text
         self.font = font
         self.bg = bg
         self.fg = fg
+        self.ui = ui if ui is not None else UIResources()
 
     def draw(self, surf:pygame.Surface):
         pygame.draw.rect(surf, self.bg, self.rect, border_radius=8)
         pygame.draw.rect(surf, (0,0,0), self.rect, 2, border_radius=8)
-        txt = self.font.render(self.text, True, self.fg)
+        txt = self.ui.text(self.font, self.text, self.fg)
         surf.blit(txt, (self.rect.centerx - txt.get_width() // 2, self.rect.centery - txt.get_height() // 2))
 
     def is_clicked(self, pos):
         return self.rect.collidepoint(pos)
 
 # ------------------------------
-# GAME (control principal) - (Ajustada para la nueva física)
+# SPAWNS (decisiones como datos, sin sprites)
 # ------------------------------
-class Game:
+# [NUEVO] Las decisiones de spawn se separan de la creación de sprites para
+# poder calcularlas por chunk en otro hilo. Cada chunk usa su propio
+# random.Random(seed, chunk), así el resultado es el mismo se calcule donde
+# se calcule.
+SPAWN_START_TILE = 10 # Primer tile con coleccionables/decoraciones
+SPAWN_RNG_SALT = 1
+
+
+class SpawnState:
+    """Estado de separación entre spawns que pasa de un chunk al siguiente."""
+    __slots__ = ('last_collectible_tile', 'last_coin_tile', 'last_decoration_tile', 'tree_toggle')
+
     def __init__(self):
-        pygame.init()
-        try:
-            pygame.mixer.init()
-        except Exception:
-            pass
-        self.screen = pygame.display.set_mode((SCREEN_W, SCREEN_H))
-        pygame.display.set_caption("Hill Drive Evo 9 - Profesional")
-        self.clock = pygame.time.Clock()
-        self.font = pygame.font.SysFont("consolas", 24)
+        self.last_collectible_tile = -999
+        self.last_coin_tile = -999
+        self.last_decoration_tile = -999
+        self.tree_toggle = False # Para alternar arbol1/arbol2
 
-        # assets (carga con fallback)
-        self.sky = load_image("assets/sky.png", (SCREEN_W * 2, SCREEN_H), alpha=False, fallback_color=(120,200,255))
-        self.ground = load_image("assets/ground.png", (TILE_SIZE, TILE_SIZE), alpha=False, fallback_color=(160,100,50))
-        self.street_img = load_image("assets/calle.png", (TILE_SIZE, TILE_SIZE), alpha=False, fallback_color=(120,120,120))
-        
-        # Coche: cargado y escalado
-        car_original_img = load_image("assets/lancer.png", size=None, alpha=True, fallback_color=(220,220,220))
-        try:
-            ow, oh = car_original_img.get_size()
-            # [MODIFICADO] Usa la constante CAR_SCALE actualizada (0.45)
-            tw = max(1, int(ow * CAR_SCALE))
-            th = max(1, int(oh * CAR_SCALE))
-            self.car_img = pygame.transform.scale(car_original_img, (tw, th))
-        except Exception:
-            self.car_img = car_original_img
-            
-        self.coin_img = load_image("assets/coin.png", (36,36), alpha=True, fallback_color=(240,220,20))
-        self.nos_img = load_image("assets/nos.png", (40,40), alpha=True, fallback_color=(120,200,255))
-        self.fuel_img = load_image("assets/fuel.png", (40,40), alpha=True, fallback_color=(200,0,0))
-        
-        # [NUEVO] Carga de assets de decoración
-        # (Línea ~548)
-        self.fuel_img = load_image("assets/fuel.png", (40,40), alpha=True, fallback_color=(200,0,0))
-        
-        # [NUEVO] Carga de assets de decoración (MODIFICADO para escalar)
-        try:
-            tree1_original = load_image("assets/arbol1.png", size=None, alpha=True, fallback_color=(40, 100, 40))
-            ow, oh = tree1_original.get_size()
-            tw, th = max(1, int(ow * TREE_SCALE)), max(1, int(oh * TREE_SCALE))
-            self.tree1_img = pygame.transform.scale(tree1_original, (tw, th))
-        except Exception:
-            # Fallback con un tamaño fijo razonable si falla
-            self.tree1_img = load_image("assets/arbol1.png", size=(80, 160), alpha=True, fallback_color=(40, 100, 40)) 
+    def copy(self) -> 'SpawnState':
+        other = SpawnState()
+        for name in self.__slots__:
+            setattr(other, name, getattr(self, name))
+        return other
 
-        try:
-            tree2_original = load_image("assets/arbol2.png", size=None, alpha=True, fallback_color=(60, 120, 60))
-            ow, oh = tree2_original.get_size()
-            tw, th = max(1, int(ow * TREE_SCALE)), max(1, int(oh * TREE_SCALE))
-            self.tree2_img = pygame.transform.scale(tree2_original, (tw, th))
-        except Exception:
-            # Fallback con un tamaño fijo razonable si falla
-            self.tree2_img = load_image("assets/arbol2.png", size=(80, 160), alpha=True, fallback_color=(60, 120, 60))
 
+# [MODIFICADO] plan_collectible y plan_decoration se integraron en plan_spawns
+# (una sola pasada por tile, con el estado de separación en variables locales)
+
+class SpawnBatch:
+    """Registros de spawn compactos: arrays paralelos en orden de tile.
 
-        # sonidos
-        self.sfx_pick = load_sound_cached("assets/sfx_pickup.wav")
-        self.sfx_gameover = load_sound_cached("assets/sfx_gameover.wav")
-        music_loaded = load_music("assets/music.ogg")
-        if music_loaded:
+    El registro i es (tiles[i], kinds[i], xs[i], ys[i]); el tipo va como
+    código de SPAWN_KINDS hasta llegar al EntityStore. La y de un
+    coleccionable ya lleva el offset vertical; la de un árbol es su base.
+    """
+    __slots__ = ('tiles', 'kinds', 'xs', 'ys')
+
+    def __init__(self):
+        self.tiles = array('i')
+        self.kinds = array('b') # Índices en SPAWN_KINDS (como en EntityStore)
+        self.xs = array('i')
+        self.ys = array('i')
+
+    def __len__(self) -> int:
+        return len(self.tiles)
+
+
+def plan_spawns(seed: int, first_chunk: int, luts, state: SpawnState, tile_size: int = TILE_SIZE,
+                first_tile: int = SPAWN_START_TILE) -> Tuple[SpawnBatch, SpawnState]:
+    """Coleccionables y árboles de chunks consecutivos en una sola pasada.
+
+    ``luts`` son las tablas (TerrainLUT) de los chunks first_chunk,
+    first_chunk + 1, ...; las alturas salen de ellas sin pasar por Terrain.
+    Cada chunk sortea con su propio chunk_rng, en el mismo orden que antes,
+    así el resultado no depende de cuántos chunks se pidan a la vez.
+    Devuelve los registros y el estado de separación al terminar.
+    """
+    batch = SpawnBatch()
+    add_tile, add_kind = batch.tiles.append, batch.kinds.append
+    add_x, add_y = batch.xs.append, batch.ys.append
+    last_collectible = state.last_collectible_tile
+    last_coin = state.last_coin_tile
+    last_decoration = state.last_decoration_tile
+    tree_toggle = state.tree_toggle
+    # Se leen una vez por llamada (el barrido de parámetros los cambia)
+    coin_chance, fuel_chance, nos_chance = COIN_SPAWN_CHANCE, FUEL_SPAWN_CHANCE, NOS_SPAWN_CHANCE
+    coin_sep, collectible_sep = COIN_MIN_SEPARATION_TILES, COLLECTIBLE_MIN_SEPARATION_TILES
+    decoration_chance, decoration_sep = DECORATION_SPAWN_CHANCE, DECORATION_MIN_SEPARATION_TILES
+    item_dx, tree_dx = tile_size // 2, DECORATION_X_OFFSET_PX
+    item_t, tree_t = item_dx / tile_size, tree_dx / tile_size
+
+    for i, lut in enumerate(luts):
+        chunk_idx = first_chunk + i
+        rand = chunk_rng(seed, chunk_idx, SPAWN_RNG_SALT).random
+        heights, slopes = lut.heights, lut.slopes
+        n = len(heights)
+        base = chunk_idx * n
+        for offset in range(max(0, first_tile - base), n):
+            tile_idx = base + offset
+            # Coleccionable: primero moneda, si no fuel/nos
+            kind = -1
+            if tile_idx - last_coin >= coin_sep and rand() < coin_chance:
+                kind = _COIN
+                last_coin = last_collectible = tile_idx
+            elif tile_idx - last_collectible >= collectible_sep:
+                if rand() < nos_chance:
+                    kind = _NOS
+                    last_collectible = tile_idx
+                elif rand() < fuel_chance:
+                    kind = _FUEL
+                    last_collectible = tile_idx
+            if kind >= 0:
+                add_tile(tile_idx)
+                add_kind(kind)
+                add_x(tile_idx * tile_size + item_dx)
+                add_y(int(int(heights[offset] + slopes[offset] * item_t) + COLLECTIBLE_VERTICAL_OFFSET))
+            # Árbol (alternando arbol1/arbol2)
+            if tile_idx - last_decoration >= decoration_sep and rand() <= decoration_chance:
+                add_tile(tile_idx)
+                add_kind(_TREE1 if tree_toggle else _TREE2)
+                tree_toggle = not tree_toggle
+                last_decoration = tile_idx
+                # La x es el inicio del tile + offset; la y es la base del árbol
+                add_x(tile_idx * tile_size + tree_dx)
+                add_y(int(heights[offset] + slopes[offset] * tree_t))
+
+    state = SpawnState()
+    state.last_collectible_tile = last_collectible
+    state.last_coin_tile = last_coin
+    state.last_decoration_tile = last_decoration
+    state.tree_toggle = tree_toggle
+    return batch, state
+
+
+class ChunkData(NamedTuple):
+    """Un chunk listo para enganchar al juego (solo datos)."""
+    chunk_idx: int
+    heights: array
+    next_y: int
+    placements: SpawnBatch # [MODIFICADO] Registros compactos en orden de tile
+    state: SpawnState # Estado de spawn al terminar el chunk
+    lut: TerrainLUT # [NUEVO] Tabla del chunk, ya calculada para los spawns
+
+
+def plan_chunk(seed: int, chunk_idx: int, heights: array, next_y: int, state: SpawnState,
+               tile_size: int = TILE_SIZE, first_tile: int = SPAWN_START_TILE) -> ChunkData:
+    lut = build_chunk_lut(heights, next_y, tile_size)
+    placements, state = plan_spawns(seed, chunk_idx, (lut,), state, tile_size, first_tile)
+    return ChunkData(chunk_idx, heights, next_y, placements, state, lut)
+
+
+def produce_chunk(terrain: 'Terrain', chunk_idx: int, start_y: int, state: SpawnState) -> ChunkData:
+    """Genera alturas y spawns de un chunk sin tocar el estado del terreno."""
+    heights, next_y = terrain.generate_heights(chunk_idx, start_y)
+    return plan_chunk(terrain.seed, chunk_idx, heights, next_y, state, terrain.tile_size)
+
+
+# ------------------------------
+# STREAMING DEL MUNDO (generación repartida entre frames)
+# ------------------------------
+class ChunkPrefetcher:
+    """Hilo que pre-genera chunks (alturas + spawns) en una cola acotada.
+
+    El hilo solo produce ChunkData; el bucle principal los engancha con
+    take(). Si la cola está vacía, take() devuelve None (cuenta un stall) y
+    el llamador genera el chunk él mismo; como la generación es
+    determinista, el chunk repetido que llegue después se descarta.
+    """
+    def __init__(self, produce, queue_chunks: int = WORKER_QUEUE_CHUNKS):
+        self.produce = produce # (chunk_idx, start_y, state) -> ChunkData
+        self.queue = queue.Queue(maxsize=queue_chunks)
+        self.lock = threading.Lock()
+        self.epoch = 0 # Cambia con cada reset(); invalida lo que ya estaba en cola
+        self.cursor = None # (epoch, chunk_idx, start_y, state) desde donde producir
+        self.wake = threading.Event()
+        self.stop_event = threading.Event()
+        # Contadores
+        self.produced = 0
+        self.attached = 0
+        self.stalls = 0
+        self.discarded = 0
+        # Con el GIL, un hilo de Python puede retener el intérprete hasta el
+        # intervalo de cambio (5 ms por defecto); se acorta para no robar frames
+        # (es global del intérprete: close() deja el valor anterior)
+        self.prev_switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(0.001)
+        self.thread = threading.Thread(target=self._run, name="ChunkPrefetcher", daemon=True)
+        self.thread.start()
+
+    def queue_depth(self) -> int:
+        return self.queue.qsize()
+
+    def reset(self, chunk_idx: int, start_y: int, state: SpawnState):
+        with self.lock:
+            self.epoch += 1
+            self.cursor = (self.epoch, chunk_idx, start_y, state.copy())
+        while True:
             try:
-                pygame.mixer.music.play(-1)
-            except Exception:
-                pass
+                self.queue.get_nowait()
+            except queue.Empty:
+                break
+        self.wake.set()
+
+    def take(self, chunk_idx: int):
+        """Devuelve el ChunkData de chunk_idx si ya está en cola, o None."""
+        while True:
+            try:
+                epoch, data = self.queue.get_nowait()
+            except queue.Empty:
+                self.stalls += 1
+                return None
+            if epoch != self.epoch or data.chunk_idx < chunk_idx:
+                self.discarded += 1 # Ya generado en el hilo principal o de otra partida
+                continue
+            self.attached += 1
+            return data
+
+    def close(self):
+        self.stop_event.set()
+        self.wake.set()
+        self.thread.join(timeout=1.0)
+        if self.prev_switch_interval is not None:
+            sys.setswitchinterval(self.prev_switch_interval)
+            self.prev_switch_interval = None
+
+    def _run(self):
+        epoch = None
+        while not self.stop_event.is_set():
+            with self.lock:
+                cursor = self.cursor
+            if cursor is None:
+                self.wake.wait(0.1)
+                self.wake.clear()
+                continue
+            if cursor[0] != epoch:
+                epoch, chunk_idx, start_y, state = cursor
+            data = self.produce(chunk_idx, start_y, state)
+            self.produced += 1
+            while not self.stop_event.is_set() and epoch == self.epoch:
+                try:
+                    self.queue.put((epoch, data), timeout=0.05)
+                except queue.Full:
+                    continue
+                chunk_idx, start_y, state = chunk_idx + 1, data.next_y, data.state
+                break
+
+
+class WorldStreamer:
+    """Mantiene terreno y spawns por delante de la cámara sin picos de frame.
+
+    Cada frame toma el siguiente chunk (del ChunkPrefetcher si hay uno, o
+    generándolo aquí) y engancha sus spawns de uno en uno con attach, hasta
+    llegar a la marca alta o agotar budget_ms. Si lo poblado queda por
+    debajo de la marca baja, sigue aunque se pase del presupuesto: el
+    jugador nunca llega a terreno vacío.
+    """
+    def __init__(self, terrain: Terrain, attach, budget_ms: float = STREAM_BUDGET_MS,
+                 low_water: int = STREAM_LOW_WATER_TILES, high_water: int = STREAM_HIGH_WATER_TILES,
+                 prefetcher: ChunkPrefetcher = None):
+        self.terrain = terrain
+        self.attach = attach # (tile_idx, kind_code, world_x, world_y) -> None
+        self.budget_ms = budget_ms
+        self.low_water = low_water
+        self.high_water = high_water
+        self.prefetcher = prefetcher
+        self.reset()
+        # Estadísticas (para depurar)
+        self.last_frame_ms = 0.0
+        self.last_frame_tiles = 0
+        self.over_budget_frames = 0
+
+    def reset(self):
+        self.state = SpawnState()
+        self.next_chunk = 0
+        self.pending = SpawnBatch() # Spawns del chunk actual...
+        self.pending_pos = 0 # ...a partir de este registro, aún sin enganchar
+        self.pending_end = 0
+        self.spawned_until = 0 # Primer tile todavía sin spawns
+        if self.prefetcher is not None:
+            self.prefetcher.reset(0, self.terrain.chunk_start_y(0), self.state)
+
+    def _next_chunk_data(self) -> ChunkData:
+        k = self.next_chunk
+        data = self.prefetcher.take(k) if self.prefetcher is not None else None
+        if data is not None:
+            self.terrain.attach_chunk(k, data.heights, data.next_y)
+            self.terrain.luts.setdefault(k, data.lut)
+        else:
+            heights = self.terrain.tiles.chunk(k)
+            next_y = self.terrain.chunk_start_y(k + 1)
+            self.terrain.ensure_tiles((k + 1) * self.terrain.chunk_tiles - 1)
+            data = plan_chunk(self.terrain.seed, k, heights, next_y, self.state, self.terrain.tile_size)
+        self.state = data.state
+        self.next_chunk = k + 1
+        return data
+
+    def _work(self, low: int, high: int, deadline: float):
+        while self.spawned_until < high:
+            if self.spawned_until >= low and time.perf_counter() >= deadline:
+                break
+            batch, i = self.pending, self.pending_pos
+            if i >= len(batch):
+                data = self._next_chunk_data()
+                batch, i = data.placements, 0
+                self.pending = batch
+                self.pending_end = self.next_chunk * self.terrain.chunk_tiles
+            if i < len(batch):
+                self.attach(batch.tiles[i], batch.kinds[i], batch.xs[i], batch.ys[i])
+                i += 1
+                self.pending_pos = i
+            self.spawned_until = batch.tiles[i] if i < len(batch) else self.pending_end
 
-        # instancias
-        self.terrain = Terrain(TILE_SIZE, INITIAL_TILES, TERRAIN_Y, self.ground)
-        self.car_body = CarBody(self.car_img)
-        self.player = Player(PLAYER_SCREEN_X, self.car_body)
-        self.hud = HUD(self.font)
-        self.camera_x = 0.0
-        
-        # [NUEVO] Grupos para decoraciones
-        self.decorations = pygame.sprite.Group()
-        self.decoration_tiles = set()
-        self.last_decoration_tile = -999
-        self.tree_toggle = False # Para alternar arbol1/arbol2
+    def fill(self, until_tile: int):
+        """Puebla hasta until_tile de una vez (arranque y reinicio)."""
+        self._work(until_tile, until_tile, 0.0)
 
-        # collectibles
-        self.collectibles = pygame.sprite.Group()
-        self.collectible_tiles = set()
-        self.last_collectible_tile = -999
-        self.last_coin_tile = -999
+    def step(self, camera_tile: int):
+        t0 = time.perf_counter()
+        start = self.spawned_until
+        self._work(camera_tile + self.low_water, camera_tile + self.high_water, t0 + self.budget_ms / 1000.0)
+        self.last_frame_tiles = self.spawned_until - start
+        self.last_frame_ms = (time.perf_counter() - t0) * 1000.0
+        if self.last_frame_ms > self.budget_ms:
+            self.over_budget_frames += 1
 
-        self.spawn_initial_collectibles()
-        
-        
 
-        # UI: menu buttons
-        btn_w, btn_h = 220, 52
-        self.btn_play = Button(pygame.Rect((SCREEN_W//2 - btn_w//2, SCREEN_H//2 - 70, btn_w, btn_h)), "JUGAR", self.font)
-        self.btn_quit = Button(pygame.Rect((SCREEN_W//2 - btn_w//2, SCREEN_H//2 + 0, btn_w, btn_h)), "SALIR", self.font)
+# ------------------------------
+# PROFILER (tiempos por fase de cada frame)
+# ------------------------------
+class _Phase:
+    """Cronómetro de una fase; se reutiliza en cada frame."""
+    __slots__ = ('samples', 'start', 'elapsed')
 
-        # estado
-        self.running = True
-        self.in_menu = True
+    def __init__(self, history: int):
+        self.samples = deque(maxlen=history)
+        self.start = 0.0
+        self.elapsed = 0.0 # Acumulado en el frame actual (una fase puede repetirse)
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed += time.perf_counter() - self.start
+        return False
+
+
+_NO_PHASE = nullcontext()
+
+
+class FrameProfiler:
+    """Tiempos por fase con historial de los últimos frames.
+
+    ``with profiler.phase("update.player"): ...`` mide una fase; apagado,
+    ``phase`` devuelve siempre el mismo contexto vacío y no mide nada.
+    ``begin_frame``/``end_frame`` delimitan un frame y guardan lo medido;
+    ``stats`` da p50/p95/p99/máximo en milisegundos por fase.
+    """
+    FRAME = "frame"
+
+    def __init__(self, enabled: bool = PROFILER_ENABLED, history: int = PROFILER_HISTORY_FRAMES):
+        self.enabled = enabled
+        self.history = history
+        self.phases = {}
+        self.frames = 0
+        self.frame_start = None # None: el frame empezó con el perfilador apagado
+        self.meta = {} # Datos sueltos para el informe (p.ej. tiempos de arranque)
+
+    def phase(self, name: str):
+        if not self.enabled:
+            return _NO_PHASE
+        p = self.phases.get(name)
+        if p is None:
+            p = self.phases[name] = _Phase(self.history)
+        return p
+
+    def begin_frame(self):
+        self.frame_start = time.perf_counter() if self.enabled else None
+
+    def end_frame(self):
+        if not self.enabled:
+            return
+        if self.frame_start is None:
+            # Se encendió a mitad de frame (F4): lo medido es parcial, se descarta
+            for p in self.phases.values():
+                p.elapsed = 0.0
+            return
+        frame = self.phase(self.FRAME)
+        frame.elapsed = time.perf_counter() - self.frame_start
+        for p in self.phases.values():
+            p.samples.append(p.elapsed)
+            p.elapsed = 0.0
+        self.frames += 1
+
+    def frame_times(self) -> list:
+        p = self.phases.get(self.FRAME)
+        return list(p.samples) if p is not None else []
+
+    def stats(self) -> dict:
+        result = {}
+        for name, p in self.phases.items():
+            if not p.samples:
+                continue
+            ordered = sorted(p.samples)
+            n = len(ordered)
+            result[name] = {
+                'p50': ordered[n // 2] * 1000,
+                'p95': ordered[min(n - 1, int(n * 0.95))] * 1000,
+                'p99': ordered[min(n - 1, int(n * 0.99))] * 1000,
+                'max': ordered[-1] * 1000,
+            }
+        return result
+
+    def report(self) -> dict:
+        return {'frames': self.frames, 'history': self.history, 'phases_ms': self.stats(), **self.meta}
+
+    def dump(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, indent=2)
+
+
+# ------------------------------
+# WORLD (lógica del juego, sin pantalla ni sonido)
+# ------------------------------
+# [NUEVO] Entrada inyectada para la simulación sin ventana
+class DriveKeys:
+    """Imita pygame.key.get_pressed(): throttle 1 acelera, -1 reversa, 0 suelta."""
+    __slots__ = ('throttle',)
+
+    def __init__(self, throttle: int = 0):
+        self.throttle = throttle
+
+    def __getitem__(self, key: int) -> bool:
+        if key == pygame.K_d:
+            return self.throttle > 0
+        if key == pygame.K_a:
+            return self.throttle < 0
+        return False
+
+    @staticmethod
+    def throttle_of(keys) -> int:
+        """Lo que Player.update lee de unas teclas cualesquiera."""
+        if keys[pygame.K_d]:
+            return 1
+        if keys[pygame.K_a]:
+            return -1
+        return 0
+
+
+# [NUEVO] Grabación de partidas: semilla, generador de terreno, dt y el
+# acelerador de cada paso de física (un byte por paso, comprimido). Con la
+# misma semilla, el mismo generador y la misma entrada por paso, World llega
+# exactamente al mismo estado.
+REPLAY_MAGIC = b"HDR2"
+_REPLAY_HEADER = struct.Struct("<4sQ?dI") # magic, semilla, terreno NumPy, dt, pasos
+
+
+class InputRecording:
+    """Entrada de una partida, paso a paso; se graba y se reproduce."""
+
+    def __init__(self, seed: int, dt: float = PHYSICS_DT, throttles: bytes = b"",
+                 vectorized: bool = False):
+        self.seed = seed
+        self.dt = dt
+        self.vectorized = vectorized # El terreno salió de generate_terrain_chunks_np
+        self.throttles = array('b', throttles)
+        self._keys = {t: DriveKeys(t) for t in (-1, 0, 1)}
+
+    def __len__(self) -> int:
+        return len(self.throttles)
+
+    def record(self, keys):
+        self.throttles.append(DriveKeys.throttle_of(keys))
+
+    def keys_at(self, step: int) -> DriveKeys:
+        """Teclas del paso ``step`` (tras el final, suelto)."""
+        if step < len(self.throttles):
+            return self._keys[self.throttles[step]]
+        return self._keys[0]
+
+    def save(self, path: str):
+        header = _REPLAY_HEADER.pack(REPLAY_MAGIC, self.seed, self.vectorized, self.dt, len(self.throttles))
+        with open(path, "wb") as f:
+            f.write(header + zlib.compress(self.throttles.tobytes(), 9))
+
+    @classmethod
+    def load(cls, path: str) -> 'InputRecording':
+        with open(path, "rb") as f:
+            data = f.read()
+        if data[:4] != REPLAY_MAGIC or len(data) < _REPLAY_HEADER.size:
+            raise ValueError(f"{path}: no es una grabación de Hill Drive (o es de una versión anterior)")
+        magic, seed, vectorized, dt, steps = _REPLAY_HEADER.unpack_from(data)
+        throttles = zlib.decompress(data[_REPLAY_HEADER.size:])
+        if len(throttles) != steps:
+            raise ValueError(f"{path}: grabación incompleta ({len(throttles)} de {steps} pasos)")
+        return cls(seed, dt, throttles, vectorized)
+
+    def terrain_vectorized(self) -> bool:
+        """Generador de terreno con el que reproducir (error si aquí no está)."""
+        if self.vectorized and np is None:
+            raise ValueError("la grabación usa el terreno generado con NumPy y NumPy no está instalado")
+        return self.vectorized
+
+
+# [NUEVO] Imágenes que la lógica necesita (sus tamaños definen las colisiones)
+# [MODIFICADO] Salen del atlas (escaladas una sola vez y guardadas en disco)
+def load_world_images() -> dict:
+    atlas = get_atlas()
+    return {kind: atlas.get(kind) for kind in ('car', 'coin', 'nos', 'fuel', 'tree1', 'tree2')}
+
+
+class World:
+    """Terreno, jugador, spawns y reglas de combustible / game over.
+
+    No usa la pantalla ni el mixer: ``step(dt, keys)`` avanza la simulación
+    y las recogidas y el game over se avisan con ``on_pickup(kind)`` y
+    ``on_game_over()``. Game lo dibuja; ``run_headless`` lo ejecuta solo.
+    """
+    def __init__(self, images: dict, ground_img: pygame.Surface = None, seed: int = TERRAIN_SEED,
+                 worker: bool = WORKER_PREGEN, vectorized: bool = TERRAIN_VECTORIZED):
+        self.terrain = Terrain(TILE_SIZE, INITIAL_TILES, TERRAIN_Y, ground_img, seed=seed,
+                               vectorized=vectorized)
+        self.car_body = CarBody(images['car'])
+        self.player = Player(PLAYER_SCREEN_X, self.car_body)
+        self.camera_x = 0.0
+        self.prev_camera_x = 0.0 # Cámara del paso anterior (interpolación)
+        self.accumulator = 0.0 # [NUEVO] Tiempo real pendiente de simular
+        self.last_frame_steps = 0
+        self.dropped_seconds = 0.0 # Tiempo descartado por MAX_PHYSICS_STEPS
         self.game_over = False
+        self.on_pickup = None
+        self.on_game_over = None
+        self.profiler = FrameProfiler(enabled=False) # [NUEVO] Game pone el suyo
+        self.steps = 0 # [NUEVO] Pasos de física desde restart()
+        self.recorder = None # InputRecording donde se graba cada paso
+        self.replay = None # InputRecording que sustituye a la entrada
+
+        # [MODIFICADO] Coleccionables y decoraciones en arrays, ordenados por tile
+        self.collectibles = EntityStore(images)
+        self.decorations = EntityStore(images)
+        # Ancho máximo de cada tipo de entidad (margen para buscar por tile)
+        self.collectible_max_w = max(images[k].get_width() for k in ('coin', 'fuel', 'nos'))
+        self.decoration_max_w = max(images['tree1'].get_width(), images['tree2'].get_width())
+
+        # Streaming: el mundo se puebla poco a poco en step(),
+        # opcionalmente pre-generado en un hilo aparte
+        self.prefetcher = None
+        if worker:
+            self.prefetcher = ChunkPrefetcher(
+                lambda k, y, state: produce_chunk(self.terrain, k, y, state))
+        self.streamer = WorldStreamer(self.terrain, self.attach_spawn, prefetcher=self.prefetcher)
+
+        self.spawn_initial_collectibles()
+
+    def close(self):
+        if self.prefetcher is not None:
+            self.prefetcher.close()
 
     def spawn_initial_collectibles(self):
-        # Resetear el estado de los coleccionables
-        self.collectibles.empty()
-        self.collectible_tiles.clear()
-        self.last_collectible_tile = -999
-        self.last_coin_tile = -999
-        
-        # [MODIFICADO] La altura Y se calcula dinámicamente en spawn_collectible_at_tile
-        # por lo que aquí solo iteramos
-        
-        end = min(len(self.terrain.tiles), 300)
-        
-        for tile_idx in range(10, end):
-            self.spawn_collectible_at_tile(tile_idx)
-            # [NUEVO] También spawnear decoraciones iniciales
-            self.spawn_decoration_at_tile(tile_idx)
+        # Resetear el estado de los coleccionables y decoraciones
+        self.collectibles.clear()
+        self.decorations.clear()
 
+        # [MODIFICADO] Las decisiones se toman por chunk (ver plan_chunk);
+        # aquí se pueblan los primeros 300 tiles de una vez
+        self.streamer.reset()
+        self.streamer.fill(min(len(self.terrain.tiles), 300))
 
     def force_spawn_near_player(self):
         camera_tile = int(self.camera_x) // TILE_SIZE
         start = camera_tile + 3
         
+        spawns = []
         for i, t in enumerate(range(start, start + 16)):
-            if t in self.collectible_tiles:
+            if t in self.collectibles:
                 continue
             
             kind = None
@@ -651,121 +2016,395 @@ class Game:
                 continue
             
             wx = t * TILE_SIZE + TILE_SIZE // 2
-            
-            # [MODIFICADO] Usar la Y interpolada del terreno + offset
-            terrain_y_at_tile = self.terrain.terrain_interpolated_y(wx)
+            spawns.append((t, kind, wx))
+
+        # [MODIFICADO] Usar la Y interpolada del terreno + offset (una consulta en lote)
+        terrain_ys = self.terrain.heights_at([wx for _, _, wx in spawns])
+        for (t, kind, wx), terrain_y_at_tile in zip(spawns, terrain_ys):
             wy = int(terrain_y_at_tile + COLLECTIBLE_VERTICAL_OFFSET)
-            
-            img = self.coin_img
-            if kind == 'fuel':
-                img = self.fuel_img
-            elif kind == 'nos':
-                img = self.nos_img
-                
-            c = Collectible(wx, wy, img, kind)
-            self.collectibles.add(c)
-            self.collectible_tiles.add(t)
-            self.last_collectible_tile = t
-            if kind == 'coin':
-                self.last_coin_tile = t
-
-    def spawn_collectible_at_tile(self, tile_idx:int):
-        # [MODIFICADO] Esta función ahora calcula la Y correcta basada en el terreno
-        
-        if tile_idx in getattr(self, 'collectible_tiles', set()):
-            return
-        
-        last_collect = getattr(self, 'last_collectible_tile', -999)
-        last_coin = getattr(self, 'last_coin_tile', -999)
-        
-        # Calcular la altura de spawn sobre el terreno en ese tile
-        wx = tile_idx * TILE_SIZE + TILE_SIZE // 2
-        
-        # Aseguramos que el tile exista antes de pedir la Y interpolada
-        if tile_idx + 1 >= len(self.terrain.tiles):
-             self.terrain.ensure_tiles(tile_idx + 1)
-             
-        terrain_y_at_tile = self.terrain.terrain_interpolated_y(wx)
-        # [MODIFICADO] Usa el offset global
-        wy = int(terrain_y_at_tile + COLLECTIBLE_VERTICAL_OFFSET)
-
-        spawned = False
-        kind = None
-
-        # Intentar coin
-        if tile_idx - last_coin >= COIN_MIN_SEPARATION_TILES and random.random() < COIN_SPAWN_CHANCE:
-            kind = 'coin'
-            self.last_coin_tile = tile_idx
-            self.last_collectible_tile = tile_idx
-            spawned = True
-        # Intentar fuel/nos
-        elif tile_idx - last_collect >= COLLECTIBLE_MIN_SEPARATION_TILES:
-            if random.random() < NOS_SPAWN_CHANCE:
-                kind = 'nos'
-                self.last_collectible_tile = tile_idx
-                spawned = True
-            elif random.random() < FUEL_SPAWN_CHANCE:
-                kind = 'fuel'
-                self.last_collectible_tile = tile_idx
-                spawned = True
-
-        if spawned:
-            img = self.coin_img
-            if kind == 'fuel':
-                img = self.fuel_img
-            elif kind == 'nos':
-                img = self.nos_img
-            
-            c = Collectible(wx, wy, img, kind)
-            self.collectibles.add(c)
-            self.collectible_tiles.add(tile_idx)
+            self.attach_spawn(t, SPAWN_KIND_CODES[kind], wx, wy)
 
-    # [NUEVO] Método para spawnear árboles
-    def spawn_decoration_at_tile(self, tile_idx: int):
-        if tile_idx in self.decoration_tiles:
-            return
-        if tile_idx - self.last_decoration_tile < DECORATION_MIN_SEPARATION_TILES:
-            return
-        if random.random() > DECORATION_SPAWN_CHANCE:
+    # [NUEVO] Añade la entidad de una decisión de spawn (tile_idx, código de tipo, x, y)
+    def attach_spawn(self, tile_idx: int, code: int, wx: int, wy: int):
+        # [MODIFICADO] La y de un árbol es su base
+        store = self.decorations if code >= _TREE1 else self.collectibles
+        if tile_idx in store:
             return
+        store.add(tile_idx, code, wx, wy)
 
-        # Calcular Posición X: inicio del tile + offset
-        wx = (tile_idx * TILE_SIZE) + DECORATION_X_OFFSET_PX
-        
-        # Asegurar que el terreno exista
-        if tile_idx + 1 >= len(self.terrain.tiles):
-             self.terrain.ensure_tiles(tile_idx + 1)
-        
-        # Obtener la Y del terreno en ese punto X
-        terrain_y_at_tile = self.terrain.terrain_interpolated_y(wx)
-        
-        # Alternar imagen de árbol
-        img = self.tree1_img if self.tree_toggle else self.tree2_img
-        self.tree_toggle = not self.tree_toggle
+    def restart(self):
+        self.game_over = False
+        self.camera_x = 0.0
+        self.prev_camera_x = 0.0
+        self.accumulator = 0.0
+        self.steps = 0
+        # [NUEVO] Los chunks lejanos pudieron descartarse: volver al terreno inicial
+        self.terrain.reset()
+        self.player.world_x = self.player.screen_x
+        self.player.world_y = TERRAIN_Y # Reinicia la base Y
+        self.player.velocity_x = 0.0
+        self.player.velocity_y = 0.0
+        self.player.prev_world_y = self.player.world_y
+        # self.player.angle = 0.0 -> ya no existe
+        self.player.coins = 0
+        self.player.fuel = MAX_FUEL
+        self.player.nos_time_left = 0.0
+        self.player.speed_multiplier = 1.0
         
-        # Crear la decoración (la Y es la base)
-        deco = Decoration(wx, terrain_y_at_tile, img)
-        self.decorations.add(deco)
-        self.decoration_tiles.add(tile_idx)
-        self.last_decoration_tile = tile_idx
+        self.spawn_initial_collectibles()
+        if DEBUG_FORCE_SPAWN:
+            self.force_spawn_near_player()
+
+    # [NUEVO] Avanza frame_dt segundos reales en pasos de PHYSICS_DT y
+    # devuelve la fracción del siguiente paso ya transcurrida (0..1) para
+    # interpolar el dibujo. Tras un parón largo se simulan como mucho
+    # MAX_PHYSICS_STEPS pasos y el resto se descarta (sin espiral de la muerte).
+    def advance(self, frame_dt: float, keys) -> float:
+        self.accumulator += frame_dt
+        steps = 0
+        while self.accumulator >= PHYSICS_DT and not self.game_over:
+            if steps == MAX_PHYSICS_STEPS:
+                self.dropped_seconds += self.accumulator
+                self.accumulator = 0.0
+                break
+            self.step(PHYSICS_DT, keys)
+            self.accumulator -= PHYSICS_DT
+            steps += 1
+        self.last_frame_steps = steps
+        return min(1.0, self.accumulator / PHYSICS_DT)
+
+    # [NUEVO] Coloca el coche entre el paso anterior y el actual y devuelve
+    # la cámara interpolada con la que dibujar
+    def interpolate(self, alpha: float) -> float:
+        player = self.player
+        y = player.prev_world_y + (player.world_y - player.prev_world_y) * alpha
+        self.car_body.set_position(player.screen_x, int(y + CAR_Y_OFFSET))
+        return self.prev_camera_x + (self.camera_x - self.prev_camera_x) * alpha
+
+    # [NUEVO] Estado de la simulación, para comprobar que una reproducción
+    # llega exactamente al mismo sitio que la partida grabada
+    def snapshot(self) -> dict:
+        p = self.player
+        return {
+            'steps': self.steps, 'world_x': p.world_x, 'world_y': p.world_y,
+            'velocity_x': p.velocity_x, 'velocity_y': p.velocity_y, 'fuel': p.fuel,
+            'coins': p.coins, 'nos_time_left': p.nos_time_left, 'game_over': self.game_over,
+        }
+
+    def step(self, dt: float, keys):
+        prof = self.profiler
+        self.prev_camera_x = self.camera_x
+        # [NUEVO] Reproducción / grabación de la entrada de cada paso
+        if self.replay is not None:
+            keys = self.replay.keys_at(self.steps)
+        if self.recorder is not None:
+            self.recorder.record(keys)
+        self.steps += 1
+
+        with prof.phase("update.player"):
+            # --- Actualización del jugador (física incluida)
+            self.player.update(dt, keys, self.terrain)
+
+            # --- Actualización de la cámara
+            self.camera_x = self.player.world_x - self.player.screen_x
+            if self.camera_x < 0:
+                self.camera_x = 0.0
+                self.player.world_x = self.player.screen_x 
+                self.player.velocity_x = max(0, self.player.velocity_x) # Evita seguir yendo a la izquierda
+
+        with prof.phase("update.streaming"):
+            # --- Generación de terreno, coleccionables y decoraciones
+            camera_tile = int(self.camera_x) // TILE_SIZE
+            self.terrain.evict_behind(camera_tile) # [NUEVO] Memoria acotada
+            # [MODIFICADO] Se genera dentro de un presupuesto de tiempo por frame
+            self.streamer.step(camera_tile)
+
+        with prof.phase("update.collectibles"):
+            # --- Limpieza (Culling) de Coleccionables: los tiles muy atrasados
+            # (300 px detrás de la cámara) se sacan del frente del índice
+            self.collectibles.pop_before(int(self.camera_x - 300) // TILE_SIZE)
+
+            # --- Colisión: solo los tiles que solapan el coche
+            car_rect = self.player.rect
+            first_tile = int(self.camera_x + car_rect.left - self.collectible_max_w) // TILE_SIZE
+            last_tile = int(self.camera_x + car_rect.right) // TILE_SIZE
+            store = self.collectibles
+            xs, ys, kinds, alive, sizes = store.xs, store.ys, store.kinds, store.alive, store.sizes
+            for i in store.span(first_tile, last_tile):
+                if not alive[i]:
+                    continue
+                w, h = sizes[kinds[i]]
+                if car_rect.colliderect((int(xs[i] - self.camera_x), ys[i], w, h)):
+                    kind = SPAWN_KINDS[kinds[i]]
+                    if kind == 'coin':
+                        self.player.coins += 1
+                    elif kind == 'fuel':
+                        self.player.fuel = min(MAX_FUEL, self.player.fuel + FUEL_PICKUP)
+                    elif kind == 'nos':
+                        self.player.nos_time_left = NOS_DURATION
+
+                    if self.on_pickup is not None:
+                        self.on_pickup(kind)
+                    store.remove(i)
+
+        with prof.phase("update.decorations"):
+            # [NUEVO] Limpieza (Culling) de Decoraciones: tiles que ya salieron de pantalla
+            self.decorations.pop_before(int(self.camera_x - self.decoration_max_w) // TILE_SIZE)
+
+        # --- Game Over
+        if self.player.fuel <= 0:
+            if not self.game_over and self.on_game_over is not None:
+                self.on_game_over()
+            self.game_over = True
+            self.player.velocity_x *= 0.8 # Frenar suavemente
+
+
+# [NUEVO] Simulación sin ventana ni sonido, a paso fijo y con entrada inyectada
+def run_headless(steps: int, dt: float = 1.0 / FPS, seed: int = None, policy=None,
+                 stop_on_game_over: bool = True, images: dict = None,
+                 profiler: FrameProfiler = None, vectorized: bool = TERRAIN_VECTORIZED) -> dict:
+    """Simula ``steps`` pasos de ``dt`` segundos y devuelve el resultado.
+
+    ``policy(step, world)`` devuelve las teclas de cada paso (por defecto
+    acelerar siempre). El resultado incluye pasos/s para medir el rendimiento.
+    ``images`` permite reutilizar load_world_images() entre partidas.
+    Con ``profiler`` cada paso cuenta como un frame.
+    """
+    world = World(images or load_world_images(), seed=seed, worker=False, vectorized=vectorized)
+    world.restart()
+    if policy is None:
+        full_throttle = DriveKeys(1)
+        policy = lambda step, world: full_throttle
+    if profiler is not None:
+        world.profiler = profiler
+    prof = world.profiler
+    game_over_step = None
+    t0 = time.perf_counter()
+    step = 0
+    while step < steps:
+        prof.begin_frame()
+        world.step(dt, policy(step, world))
+        prof.end_frame()
+        step += 1
+        if world.game_over:
+            game_over_step = step
+            if stop_on_game_over:
+                break
+    wall = time.perf_counter() - t0
+    world.close()
+    return {
+        'seed': world.terrain.seed,
+        'steps': step,
+        'sim_seconds': step * dt,
+        'wall_seconds': wall,
+        'steps_per_sec': step / wall if wall > 0 else float('inf'),
+        'distance_m': int(world.player.world_x / 100),
+        'coins': world.player.coins,
+        'fuel': world.player.fuel,
+        'game_over_step': game_over_step,
+        'state': world.snapshot(),
+    }
+
+
+# [NUEVO] Reproduce una grabación sin ventana, tan rápido como se pueda
+def replay_headless(recording: InputRecording, profiler: FrameProfiler = None) -> dict:
+    return run_headless(len(recording), recording.dt, seed=recording.seed,
+                        policy=lambda step, world: recording.keys_at(step), profiler=profiler,
+                        vectorized=recording.terrain_vectorized())
 
 
+# ------------------------------
+# CARGA POR ETAPAS (el menú aparece antes de que todo esté cargado)
+# ------------------------------
+class StartupLoader:
+    """Ejecuta etapas de carga (nombre, función) en orden.
+
+    ``step(budget_ms)`` hace al menos una etapa y sigue mientras quede
+    presupuesto; ``finish()`` hace las que falten de una vez.
+    """
+    def __init__(self, stages: list):
+        self.stages = deque(stages)
+        self.finished_at_ms = None # Desde el arranque hasta terminar la carga
+
+    @property
+    def done(self) -> bool:
+        return not self.stages
+
+    @property
+    def current(self) -> str:
+        return self.stages[0][0] if self.stages else ""
+
+    def _run_next(self):
+        name, fn = self.stages.popleft()
+        fn()
+        if not self.stages:
+            self.finished_at_ms = (time.perf_counter() - STARTUP_T0) * 1000
+
+    def step(self, budget_ms: float):
+        deadline = time.perf_counter() + budget_ms / 1000.0
+        while self.stages:
+            self._run_next()
+            if time.perf_counter() >= deadline:
+                break
+
+    def finish(self):
+        while self.stages:
+            self._run_next()
+
+
+# ------------------------------
+# GAME (control principal) - (Ajustada para la nueva física)
+# ------------------------------
+class Game:
+    def __init__(self, replay: InputRecording = None, record_path: str = RECORD_INPUT_PATH):
+        # [MODIFICADO] Solo los subsistemas que se usan; el mixer, al cargar
+        # los sonidos (ensure_mixer)
+        if MINIMAL_INIT:
+            pygame.display.init()
+            pygame.font.init()
+        else:
+            pygame.init()
+            ensure_mixer()
+        self.screen = pygame.display.set_mode((SCREEN_W, SCREEN_H))
+        pygame.display.set_caption("Hill Drive Evo 9 - Profesional")
+        self.clock = pygame.time.Clock()
+        # [MODIFICADO] Fuentes, overlays y textos desde la caché de UI
+        self.ui = UIResources()
+        self.font = self.ui.font("consolas", 24)
+        self.debug_font = self.ui.font("consolas", 16)
+
+        # assets (carga con fallback)
+        # [MODIFICADO] Para el menú basta el cielo; el resto se carga por
+        # etapas mientras el menú está quieto (ver StartupLoader)
+        self.sky = get_atlas().get('sky')
+        self.hud = HUD(self.font, self.ui)
+        # [NUEVO] Tiempos por fase (World mide sus fases con el mismo)
+        self.profiler = FrameProfiler(enabled=PROFILER_ENABLED)
+        self.view_x = 0.0 # [NUEVO] Cámara interpolada con la que se dibuja
+        # Entidades dibujadas / omitidas en el último frame (panel de depuración)
+        self.drawn_entities = 0
+        self.skipped_entities = 0
+
+        # [MODIFICADO] Una reproducción fija la semilla y el generador de
+        # terreno y sustituye al teclado. Se reproduce a PHYSICS_DT por frame.
+        if replay is not None:
+            replay.terrain_vectorized() # Falla aquí si falta NumPy
+            if replay.dt != PHYSICS_DT:
+                raise ValueError(f"la grabación usa dt={replay.dt} y el juego PHYSICS_DT={PHYSICS_DT} "
+                                 "(se puede reproducir con --headless)")
+        self.replay = replay
+        self.record_path = record_path
+        self.recording = None
+        self.world = None # Lo crea la etapa 'mundo'
+        self.loader = StartupLoader([
+            ("sprites", self.load_sprites),
+            ("sonidos", self.load_sounds),
+            ("mundo", self.build_world),
+        ])
+        self.first_frame_ms = None # [NUEVO] Desde el arranque hasta el primer frame
+        self.exit_after_first_frame = False # Para bench_startup.py
+
+        # UI: menu buttons
+        btn_w, btn_h = 220, 52
+        self.btn_play = Button(pygame.Rect((SCREEN_W//2 - btn_w//2, SCREEN_H//2 - 70, btn_w, btn_h)), "JUGAR", self.font, ui=self.ui)
+        self.btn_quit = Button(pygame.Rect((SCREEN_W//2 - btn_w//2, SCREEN_H//2 + 0, btn_w, btn_h)), "SALIR", self.font, ui=self.ui)
+
+        # estado
+        self.running = True
+        self.in_menu = True
+        self.show_debug = DEBUG_OVERLAY # [NUEVO] F3 para mostrar/ocultar
+        self.show_profiler = False # [NUEVO] F4: gráfica de tiempos de frame
+
+        # [NUEVO] Render parcial
+        self.static_drawn = False # Menú / game over ya en pantalla
+        self.last_drawn_camera_x = None # None = el próximo frame se envía completo
+        self.last_dynamic_rects = []
+        self.pixels_pushed = 0 # Píxeles enviados a pantalla en el último frame
+
+        # [NUEVO] Las reproducciones empiezan sin menú
+        if replay is not None:
+            self.start_game()
+
+    # [NUEVO] Etapas de la carga diferida
+    def load_sprites(self):
+        # [MODIFICADO] Coche, coleccionables y árboles: los mismos que usa World
+        atlas = get_atlas()
+        self.atlas_from_cache = atlas.loaded_from_cache # Panel F3
+        self.ground = atlas.get('ground')
+        self.street_img = atlas.get('street')
+        self.images = load_world_images()
+
+    def load_sounds(self):
+        # [MODIFICADO] Efectos en canales reservados y música en streaming
+        self.audio = AudioManager()
+        self.audio.load('pickup', "assets/sfx_pickup.wav")
+        self.audio.load('gameover', "assets/sfx_gameover.wav")
+        self.audio.play_music("assets/music.ogg")
+
+    def build_world(self):
+        # [MODIFICADO] Terreno, jugador y spawns viven en World (sin pantalla)
+        seed = self.replay.seed if self.replay else TERRAIN_SEED
+        vectorized = self.replay.terrain_vectorized() if self.replay else TERRAIN_VECTORIZED
+        self.world = World(self.images, self.ground, seed=seed, vectorized=vectorized)
+        self.world.replay = self.replay
+        self.world.on_pickup = self.play_pickup
+        self.world.on_game_over = self.play_game_over
+        self.world.profiler = self.profiler
+
     def run(self):
         try:
             while self.running:
-                dt_ms = self.clock.tick(FPS)
-                dt = dt_ms / 1000.0
-                self.handle_events()
+                if self.replay is not None:
+                    # [NUEVO] Reproducción: un paso de física por frame y sin
+                    # tope de FPS (más rápido que en tiempo real)
+                    self.clock.tick()
+                    dt = PHYSICS_DT
+                    if self.world.game_over or self.world.steps >= len(self.replay):
+                        self.running = False
+                        continue
+                else:
+                    dt_ms = self.clock.tick(FPS)
+                    dt = dt_ms / 1000.0
+                # [NUEVO] Menú / game over ya dibujados: no se redibuja nada
+                # hasta que llegue una entrada
+                if DIRTY_RECT_RENDERING and self.static_drawn:
+                    self.wait_for_input()
+                    continue
+                prof = self.profiler
+                prof.begin_frame()
+                with prof.phase("events"):
+                    self.handle_events()
+                self.ui.begin_frame()
                 
                 if self.in_menu:
-                    self.draw_menu()
+                    with prof.phase("draw"):
+                        self.draw_menu()
+                    rects = [self.screen.get_rect()]
                 else:
-                    if not self.game_over:
-                        self.process_input(dt) 
-                        self.update(dt)
-                    self.draw_game()
+                    if not self.world.game_over:
+                        with prof.phase("update"):
+                            self.process_input(dt) 
+                            self.update(dt)
+                    with prof.phase("draw"):
+                        rects = self.draw_game()
                     
-                pygame.display.flip()
+                with prof.phase("present"):
+                    self.present(rects)
+                if self.first_frame_ms is None:
+                    self.first_frame_ms = (time.perf_counter() - STARTUP_T0) * 1000
+                    self.profiler.meta['first_frame_ms'] = self.first_frame_ms
+                    if self.exit_after_first_frame:
+                        print(f"primer frame: {self.first_frame_ms:.1f} ms", flush=True)
+                        self.running = False
+                # [NUEVO] La carga avanza después de mostrar cada frame del menú
+                loading = self.in_menu and not self.loader.done
+                if loading:
+                    with prof.phase("loading"):
+                        self.loader.step(STARTUP_STAGE_BUDGET_MS)
+                prof.end_frame()
+                # Mientras carga (y un frame más, para quitar el aviso) el menú
+                # no se queda esperando entrada
+                self.static_drawn = (self.in_menu and not loading) or (not self.in_menu and self.world.game_over)
         except Exception as e:
             import traceback
             tb = traceback.format_exc()
@@ -800,6 +2439,15 @@ class Game:
             except Exception:
                 pass
         finally:
+            if self.world is not None:
+                self.world.close()
+            self.save_recording()
+            # [NUEVO] Informe del perfilador (solo si llegó a medir algo)
+            if self.profiler.frames and PROFILER_REPORT_PATH:
+                try:
+                    self.profiler.dump(PROFILER_REPORT_PATH)
+                except OSError:
+                    pass
             try:
                 pygame.quit()
             except Exception:
@@ -809,45 +2457,83 @@ class Game:
             except Exception:
                 pass
 
+    # [NUEVO] Envía a pantalla solo las zonas cambiadas (o todo, sin render parcial)
+    def present(self, rects: list):
+        if not DIRTY_RECT_RENDERING:
+            pygame.display.flip()
+            self.pixels_pushed = SCREEN_W * SCREEN_H
+            return
+        pygame.display.update(rects)
+        screen_rect = self.screen.get_rect()
+        self.pixels_pushed = 0
+        for r in rects:
+            clipped = screen_rect.clip(r)
+            self.pixels_pushed += clipped.width * clipped.height
+
+    # [NUEVO] Bloquea hasta la próxima entrada (o STATIC_SCREEN_WAIT_MS)
+    def wait_for_input(self):
+        event = pygame.event.wait(STATIC_SCREEN_WAIT_MS)
+        if event.type != pygame.NOEVENT:
+            pygame.event.post(event) # Lo procesa handle_events en el próximo frame
+            self.static_drawn = False
+        self.clock.tick() # El tiempo esperado no cuenta como dt del próximo frame
+        self.pixels_pushed = 0
+
     def handle_events(self):
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 self.running = False
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                self.show_debug = not self.show_debug
+                self.last_drawn_camera_x = None
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F4:
+                # [NUEVO] La gráfica enciende el perfilador; al ocultarla
+                # sigue midiendo solo si PROFILER_ENABLED
+                self.show_profiler = not self.show_profiler
+                self.profiler.enabled = self.show_profiler or PROFILER_ENABLED
+                self.last_drawn_camera_x = None
             elif self.in_menu and event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
                 pos = event.pos
                 if self.btn_play.is_clicked(pos):
                     self.start_game()
                 elif self.btn_quit.is_clicked(pos):
                     self.running = False
-            elif self.game_over and event.type == pygame.KEYDOWN:
+            elif not self.in_menu and self.world.game_over and event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_r:
                     self.restart()
                 elif event.key == pygame.K_q:
                     self.running = False
                     
     def restart(self):
-        self.game_over = False
-        self.camera_x = 0.0
-        self.player.world_x = self.player.screen_x
-        self.player.world_y = TERRAIN_Y # Reinicia la base Y
-        self.player.velocity_x = 0.0
-        self.player.velocity_y = 0.0
-        # self.player.angle = 0.0 -> ya no existe
-        self.player.coins = 0
-        self.player.fuel = MAX_FUEL
-        self.player.nos_time_left = 0.0
-        self.player.speed_multiplier = 1.0
-        
-        # [NUEVO] Limpiar decoraciones
-        self.decorations.empty()
-        self.decoration_tiles.clear()
-        self.last_decoration_tile = -999
-        
-        self.spawn_initial_collectibles()
-        if DEBUG_FORCE_SPAWN:
-            self.force_spawn_near_player()
+        self.last_drawn_camera_x = None
+        self.world.restart()
+        self.view_x = 0.0
+        # [NUEVO] Cada partida se graba desde el principio (se guarda la última)
+        if self.record_path and self.replay is None:
+            self.save_recording()
+            self.recording = InputRecording(self.world.terrain.seed, PHYSICS_DT,
+                                            vectorized=self.world.terrain.vectorized)
+            self.world.recorder = self.recording
+
+    def save_recording(self):
+        if self.recording is not None and len(self.recording):
+            try:
+                self.recording.save(self.record_path)
+            except OSError:
+                pass
+
+    # [NUEVO] Sonidos de los avisos de World
+    # [MODIFICADO] Se encolan; suenan una vez por frame en Game.update
+    def play_pickup(self, kind: str):
+        self.audio.play('pickup')
+
+    def play_game_over(self):
+        self.audio.play('gameover')
 
     def start_game(self):
+        # [NUEVO] Solo se espera si la carga no terminó mientras tanto
+        self.loader.finish()
+        self.profiler.meta['loaded_ms'] = self.loader.finished_at_ms
         self.in_menu = False
         self.restart() # Usamos restart para inicializar todo
 
@@ -856,146 +2542,225 @@ class Game:
         pass
 
     def update(self, dt:float):
-        # --- Actualización del jugador (física incluida)
-        keys = pygame.key.get_pressed()
-        self.player.update(dt, keys, self.terrain)
-        
-        # --- Actualización de la cámara
-        self.camera_x = self.player.world_x - self.player.screen_x
-        if self.camera_x < 0:
-            self.camera_x = 0.0
-            self.player.world_x = self.player.screen_x 
-            self.player.velocity_x = max(0, self.player.velocity_x) # Evita seguir yendo a la izquierda
-
-        # [MODIFICADO] Eliminada la llamada a self.player.place_on_terrain
-
-        # --- Generación de terreno, coleccionables y decoraciones
-        camera_tile = int(self.camera_x) // TILE_SIZE
-        desired_ahead = SPAWN_AHEAD_TILES + 400
-        desired_len = camera_tile + desired_ahead
-        if len(self.terrain.tiles) < desired_len:
-            old_len = len(self.terrain.tiles)
-            to_gen = desired_len - old_len
-            self.terrain.generate_chunk(to_gen)
-            # Intentar spawn en los nuevos tiles
-            for t in range(old_len, len(self.terrain.tiles)):
-                self.spawn_collectible_at_tile(t)
-                self.spawn_decoration_at_tile(t) # [NUEVO]
-
-        # --- Limpieza (Culling) y Animación de Coleccionables
-        for c in list(self.collectibles):
-            c.animate(dt)
-            c.update_screen_pos(self.camera_x)
-            
-            # Eliminar si está muy atrasado
-            if c.world_x + 300 < self.camera_x:
-                try:
-                    tidx = int(c.world_x) // TILE_SIZE
-                    self.collectible_tiles.discard(tidx)
-                except Exception:
-                    pass
-                c.kill()
-                continue
-            
-            # Colisión
-            if self.player.rect.colliderect(c.rect):
-                if c.kind == 'coin':
-                    self.player.coins += 1
-                elif c.kind == 'fuel':
-                    self.player.fuel = min(MAX_FUEL, self.player.fuel + FUEL_PICKUP)
-                elif c.kind == 'nos':
-                    self.player.nos_time_left = NOS_DURATION
-                
-                try:
-                    self.sfx_pick.play()
-                    tidx = int(c.world_x) // TILE_SIZE
-                    self.collectible_tiles.discard(tidx)
-                except Exception:
-                    pass
-                c.collect()
+        # [MODIFICADO] La lógica vive en World; aquí solo entra el teclado
+        # [MODIFICADO] A paso fijo; se dibuja interpolando entre pasos
+        alpha = self.world.advance(dt, pygame.key.get_pressed())
+        self.view_x = self.world.interpolate(alpha)
 
-        # [NUEVO] Limpieza (Culling) de Decoraciones
-        for d in list(self.decorations):
-            d.update_screen_pos(self.camera_x) # Actualiza el rect
-            # Eliminar si está muy atrasado
-            if d.world_x + d.rect.width < self.camera_x:
-                try:
-                    tidx = int(d.world_x) // TILE_SIZE
-                    self.decoration_tiles.discard(tidx)
-                except Exception:
-                    pass
-                d.kill()
+        # --- Animación (solo lo que está en pantalla)
+        camera_tile = int(self.world.camera_x) // TILE_SIZE
+        last_screen_tile = camera_tile + SCREEN_W // TILE_SIZE + 1
+        self.world.collectibles.animate(dt, camera_tile - 1, last_screen_tile)
 
-        # --- Game Over
-        if self.player.fuel <= 0:
-            if not self.game_over:
-                try:
-                    self.sfx_gameover.play()
-                except Exception:
-                    pass
-            self.game_over = True
-            self.player.velocity_x *= 0.8 # Frenar suavemente
+        # [NUEVO] Los sonidos pedidos durante los pasos de este frame
+        self.audio.flush()
 
     def draw_menu(self):
         # Fondo
         self.screen.blit(self.sky, (0, 0))
         # Overlay
-        overlay = pygame.Surface((SCREEN_W, SCREEN_H), pygame.SRCALPHA)
-        overlay.fill((0, 0, 0, 180))
-        self.screen.blit(overlay, (0, 0))
+        self.screen.blit(self.ui.overlay((SCREEN_W, SCREEN_H), (0, 0, 0, 180)), (0, 0))
         
         # Título
-        title_font = pygame.font.SysFont("consolas", 48, bold=True)
-        title_txt = title_font.render("HILL DRIVE EVO 9", True, (255, 255, 255))
+        title_font = self.ui.font("consolas", 48, bold=True)
+        title_txt = self.ui.text(title_font, "HILL DRIVE EVO 9", (255, 255, 255))
         self.screen.blit(title_txt, (SCREEN_W // 2 - title_txt.get_width() // 2, SCREEN_H // 2 - 180))
 
         # Botones
         self.btn_play.draw(self.screen)
         self.btn_quit.draw(self.screen)
 
-    def draw_game(self):
-        # Dibujar cielo (Parallax)
-        sky_scroll = int(-self.camera_x * 0.1) % self.sky.get_width()
-        self.screen.blit(self.sky, (sky_scroll, 0))
-        self.screen.blit(self.sky, (sky_scroll - self.sky.get_width(), 0))
+        # [NUEVO] Progreso de la carga en segundo plano
+        if not self.loader.done:
+            txt = self.ui.text(self.debug_font, f"Cargando {self.loader.current}...", (200, 200, 200))
+            self.screen.blit(txt, (SCREEN_W // 2 - txt.get_width() // 2, SCREEN_H // 2 + 70))
 
-        # Dibujar terreno (calle.png arriba, ground.png abajo)
-        self.terrain.draw(self.screen, self.camera_x, self.player.world_x // TILE_SIZE, self.street_img)
+    def draw_game(self):
+        prof = self.profiler
+        with prof.phase("draw.sky"):
+            # Dibujar cielo (Parallax)
+            sky_scroll = int(-self.view_x * 0.1) % self.sky.get_width()
+            self.screen.blit(self.sky, (sky_scroll, 0))
+            self.screen.blit(self.sky, (sky_scroll - self.sky.get_width(), 0))
+
+        with prof.phase("draw.terrain"):
+            # Dibujar terreno (calle.png arriba, ground.png abajo)
+            self.world.terrain.draw(self.screen, self.view_x, self.world.player.world_x // TILE_SIZE, self.street_img)
         
-        # [NUEVO] Dibujar decoraciones (árboles)
-        # Se dibujan después del terreno pero antes del jugador
-        for d in self.decorations:
-            d.draw(self.screen, self.camera_x)
-
-        # Dibujar coleccionables
-        for c in self.collectibles:
-            c.draw(self.screen, self.camera_x)
-
-        # Dibujar jugador
-        self.player.draw(self.screen)
+        with prof.phase("draw.sprites"):
+            # [NUEVO] Dibujar decoraciones (árboles)
+            # Se dibujan después del terreno pero antes del jugador.
+            # [MODIFICADO] Solo los tiles cuyo rango x puede solapar la pantalla
+            # [MODIFICADO] Posiciones en pantalla de todo lo visible en un solo paso
+            # y un Surface.blits por capa (árboles, coleccionables)
+            decorations, collectibles = self.world.decorations, self.world.collectibles
+            decorations.layout(self.view_x, *self.visible_tiles(self.world.decoration_max_w))
+            drawn = decorations.draw(self.screen)
+
+            # Dibujar coleccionables
+            collectibles.layout(self.view_x, *self.visible_tiles(self.world.collectible_max_w))
+            drawn += collectibles.draw(self.screen)
+            self.drawn_entities = drawn
+            self.skipped_entities = len(self.world.decorations) + len(self.world.collectibles) - drawn
+
+            # Dibujar jugador
+            self.world.player.draw(self.screen)
         
-        # Dibujar HUD
-        self.hud.draw(self.screen, self.player)
+        with prof.phase("draw.hud"):
+            # Dibujar HUD
+            self.hud.draw(self.screen, self.world.player)
+
+        # [NUEVO] Panel de depuración (F3)
+        if self.show_debug:
+            self.draw_debug()
+        # [NUEVO] Gráfica del perfilador (F4)
+        if self.show_profiler:
+            self.draw_profiler()
 
         # Pantalla de Game Over
-        if self.game_over:
-            overlay = pygame.Surface((SCREEN_W, SCREEN_H), pygame.SRCALPHA)
-            overlay.fill((0, 0, 0, 180))
-            self.screen.blit(overlay, (0, 0))
+        if self.world.game_over:
+            self.screen.blit(self.ui.overlay((SCREEN_W, SCREEN_H), (0, 0, 0, 180)), (0, 0))
 
-            go_font = pygame.font.SysFont("consolas", 60, bold=True)
-            go_txt = go_font.render("GAME OVER", True, (255, 60, 60))
+            go_font = self.ui.font("consolas", 60, bold=True)
+            go_txt = self.ui.text(go_font, "GAME OVER", (255, 60, 60))
             self.screen.blit(go_txt, (SCREEN_W // 2 - go_txt.get_width() // 2, SCREEN_H // 2 - 80))
 
-            score_txt = self.font.render(f"Distancia: {int(self.player.world_x / 100)}m | Monedas: {self.player.coins}", True, (255, 255, 255))
+            score_txt = self.ui.text(self.font, f"Distancia: {int(self.world.player.world_x / 100)}m | Monedas: {self.world.player.coins}", (255, 255, 255))
             self.screen.blit(score_txt, (SCREEN_W // 2 - score_txt.get_width() // 2, SCREEN_H // 2 + 10))
 
-            restart_txt = self.font.render("Presiona R para Reiniciar o Q para Salir", True, (180, 180, 180))
+            restart_txt = self.ui.text(self.font, "Presiona R para Reiniciar o Q para Salir", (180, 180, 180))
             self.screen.blit(restart_txt, (SCREEN_W // 2 - restart_txt.get_width() // 2, SCREEN_H // 2 + 60))
 
+        return self.dirty_rects()
+
+    # [NUEVO] Zonas que cambiaron respecto al frame anterior. Si la cámara se
+    # movió cambia todo; si no, solo el coche, los coleccionables visibles
+    # (vaivén / recogidos) y el HUD, tanto donde están ahora como donde estaban.
+    def dirty_rects(self) -> list:
+        # Se dibuja con int(view_x): mientras no cambie, la escena no se movió
+        # (al frenar, la x en float sigue variando mucho después de pararse)
+        camera_x = int(self.view_x)
+        camera_moved = camera_x != self.last_drawn_camera_x
+        self.last_drawn_camera_x = camera_x
+        dynamic = [self.world.car_body.rect.copy(), HUD.AREA]
+        dynamic += self.world.collectibles.screen_bounds() # Del layout de draw_game
+        rects = dynamic + [r for r in self.last_dynamic_rects if r not in dynamic]
+        self.last_dynamic_rects = dynamic
+        if camera_moved or self.show_debug or self.show_profiler or self.world.game_over:
+            return [self.screen.get_rect()]
+        return rects
+
+    # [NUEVO] Tiles cuyas entidades (de ancho máximo max_w) pueden verse en pantalla
+    def visible_tiles(self, max_w: int) -> Tuple[int, int]:
+        first = int(self.view_x - max_w) // TILE_SIZE
+        last = int(self.view_x + SCREEN_W) // TILE_SIZE
+        return first, last
+
+    # [NUEVO] Estadísticas de rendimiento en la esquina inferior izquierda
+    def draw_debug(self):
+        streamer = self.world.streamer
+        lines = [
+            f"FPS: {self.clock.get_fps():.0f}",
+            f"Arranque: primer frame {self.first_frame_ms or 0:.0f} ms, "
+            f"carga completa {self.loader.finished_at_ms or 0:.0f} ms, "
+            f"atlas {'de caché' if self.atlas_from_cache else 'rehecho'}",
+            f"Física: {self.world.last_frame_steps} pasos/frame, "
+            f"{self.world.dropped_seconds:.2f} s descartados",
+            f"Streaming: {streamer.last_frame_ms:.2f} ms/frame, {streamer.last_frame_tiles} tiles, "
+            f"poblado hasta {streamer.spawned_until}, {streamer.over_budget_frames} frames sobre presupuesto",
+            f"Terreno: {len(self.world.terrain.tiles.chunks)} chunks ({self.world.terrain.tiles.nbytes()} B)",
+            f"Entidades: {self.drawn_entities} dibujadas, {self.skipped_entities} omitidas "
+            f"({self.world.collectibles.nbytes() + self.world.decorations.nbytes()} B)",
+            f"Píxeles enviados: {self.pixels_pushed} ({100 * self.pixels_pushed // (SCREEN_W * SCREEN_H)}%)",
+            f"Superficies nuevas: {self.ui.last_frame_allocations} (total {self.ui.allocations})",
+        ]
+        cache = self.world.terrain.render_cache
+        if cache is not None:
+            lines.append(f"Franjas de terreno: {len(cache.strips)} ({cache.nbytes // 1024} KB), "
+                         f"{cache.built} compuestas")
+        if self.world.prefetcher is not None:
+            p = self.world.prefetcher
+            lines.append(f"Hilo: cola {p.queue_depth()}/{p.queue.maxsize}, producidos {p.produced}, "
+                         f"enganchados {p.attached}, stalls {p.stalls}, descartados {p.discarded}")
+        y = SCREEN_H - 10 - len(lines) * 20
+        for line in lines:
+            # Sin caché a propósito: estos textos cambian cada frame y no deben
+            # contar en las superficies de la UI
+            txt = self.debug_font.render(line, True, (255, 255, 255))
+            self.screen.blit(txt, (20, y))
+            y += 20
+
+    # [NUEVO] Tiempos de los últimos frames (barras) y percentiles por fase,
+    # en la esquina superior derecha (bajo la distancia del HUD)
+    def draw_profiler(self):
+        prof = self.profiler
+        stats = prof.stats()
+        w, graph_h, row_h = 320, 80, 18
+        x0, y0 = SCREEN_W - w - 20, 50
+        h = graph_h + (len(stats) + 1) * row_h + 12
+        self.screen.blit(self.ui.overlay((w, h), (0, 0, 0, 160)), (x0, y0))
+
+        scale = graph_h / 50.0 # 50 ms llenan la gráfica
+        base_y = y0 + graph_h
+        budget_y = base_y - int(1000.0 / FPS * scale)
+        pygame.draw.line(self.screen, (80, 200, 80), (x0, budget_y), (x0 + w - 1, budget_y))
+        times = prof.frame_times()[-w:]
+        for i, t in enumerate(times):
+            bar = min(graph_h, int(t * 1000 * scale))
+            color = (230, 80, 80) if t > 1.0 / FPS else (230, 230, 230)
+            x = x0 + w - len(times) + i
+            pygame.draw.line(self.screen, color, (x, base_y - bar), (x, base_y - 1))
+
+        # Columnas con x fija (la fuente puede no ser monoespaciada)
+        columns = (x0 + 150, x0 + 192, x0 + 234, x0 + 276)
+        rows = [("ms", ("p50", "p95", "p99", "max"), (180, 180, 180))]
+        for name in sorted(stats):
+            st = stats[name]
+            rows.append((name, tuple(f"{st[k]:.2f}" for k in ('p50', 'p95', 'p99', 'max')), (255, 255, 255)))
+        y = base_y + 6
+        for name, values, color in rows:
+            # Sin caché, como el panel de depuración
+            self.screen.blit(self.debug_font.render(name, True, color), (x0 + 6, y))
+            for cx, value in zip(columns, values):
+                self.screen.blit(self.debug_font.render(value, True, color), (cx, y))
+            y += row_h
+
 # ------------------------------
 # INICIO
 # ------------------------------
 if __name__ == "__main__":
-    game = Game()
-    game.run()
\ No newline at end of file
+    # [NUEVO] --record / --replay [--headless] [--profile]
+    import argparse
+    parser = argparse.ArgumentParser(description="Hill Drive Evo 9")
+    parser.add_argument("--record", default=RECORD_INPUT_PATH, help="grabar la entrada de la partida en este fichero")
+    parser.add_argument("--replay", help="reproducir una grabación")
+    parser.add_argument("--headless", action="store_true", help="reproducir sin ventana (requiere --replay)")
+    parser.add_argument("--profile", action="store_true", help="medir tiempos por fase desde el inicio")
+    parser.add_argument("--first-frame", action="store_true", help="salir tras el primer frame e imprimir el tiempo de arranque")
+    parser.add_argument("--full-init", action="store_true", help="iniciar todos los subsistemas de pygame (para comparar)")
+    args = parser.parse_args()
+    if args.profile:
+        PROFILER_ENABLED = True
+    if args.full_init:
+        MINIMAL_INIT = False
+    try:
+        replay = InputRecording.load(args.replay) if args.replay else None
+        if replay is not None:
+            replay.terrain_vectorized()
+    except (OSError, ValueError, zlib.error) as e:
+        parser.error(str(e))
+    if args.headless:
+        if replay is None:
+            parser.error("--headless requiere --replay")
+        profiler = FrameProfiler(enabled=args.profile)
+        result = replay_headless(replay, profiler)
+        if args.profile:
+            result['profile'] = profiler.report()
+        print(json.dumps(result, indent=2))
+    else:
+        try:
+            game = Game(replay, args.record)
+        except ValueError as e:
+            parser.error(str(e))
+        game.exit_after_first_frame = args.first_frame
+        game.run()
\ No newline at end of file